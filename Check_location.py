@@ -2,20 +2,66 @@ import pydobot
 from serial.tools import list_ports
 import time
 import sys
+import threading
 
 # --- 1. กำหนดพอร์ตและเชื่อมต่อกับ Dobot ---
 # 🎯 แก้ไข: กำหนดพอร์ตเป็น 'COM5' ชัดเจนตามที่สแกนพบ
 DOBOT_PORT = 'COM3'
+POLL_INTERVAL = 0.05  # อ่าน pose ทุก 50 ms (20 Hz)
+
+
+class DobotClient:
+    """เชื่อมต่อ Dobot และอ่าน pose ใน background thread (ไม่บล็อก thread หลัก)"""
+    
+    def __init__(self, port: str):
+        self.port = port
+        self.device = None
+        self.alive = False
+        self.last_pose = None
+        self._lock = threading.Lock()  # pydobot ไม่ thread-safe - ต้องใช้พอร์ตทีละคำสั่ง
+        self._thread = None
+    
+    def connect(self):
+        self.device = pydobot.Dobot(port=self.port, verbose=False)
+        # ตั้งค่าความเร็ว (สำคัญ)
+        with self._lock:
+            self.device.speed(velocity=100, acceleration=100)
+    
+    def start(self):
+        """เริ่ม thread อ่าน pose"""
+        self.alive = True
+        self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self._thread.start()
+    
+    def _poll_loop(self):
+        while self.alive:
+            try:
+                with self._lock:
+                    # pose() จะคืนค่า (x, y, z, r, j1, j2, j3, j4)
+                    self.last_pose = self.device.pose()
+            except Exception as e:
+                print(f"\n⚠️ อ่านพิกัดไม่สำเร็จ: {e}")
+            time.sleep(POLL_INTERVAL)
+    
+    def close(self):
+        self.alive = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if self.device is not None:
+            with self._lock:
+                self.device.close()
+
 
 print(f"Searching for Dobot on port {DOBOT_PORT}...")
 
+client = DobotClient(DOBOT_PORT)
+
 try:
     # 🎯 แก้ไข: ลองเชื่อมต่อโดยใช้พอร์ตที่ระบุ
-    device = pydobot.Dobot(port=DOBOT_PORT, verbose=False)
-    # ตั้งค่าความเร็ว (สำคัญ)
-    device.speed(velocity=100, acceleration=100) 
+    client.connect()
     
     print(f"✅ Connected to Dobot on port: {DOBOT_PORT}")
+    client.start()
     time.sleep(1)
 
 except Exception as e:
@@ -33,9 +79,11 @@ try:
         # รอให้ผู้ใช้กด Enter
         input(">> Move the arm to your desired position and press Enter to get coordinates... ")
         
-        # อ่านค่าพิกัดปัจจุบันจากแขนกล
-        # pose() จะคืนค่า (x, y, z, r, j1, j2, j3, j4)
-        current_pose = device.pose()
+        # ใช้ค่าพิกัดล่าสุดที่ thread อ่านไว้ (ไม่ต้องรอ serial)
+        current_pose = client.last_pose
+        if current_pose is None:
+            print("⏳ ยังไม่ได้รับพิกัดจากแขนกล ลองใหม่อีกครั้ง")
+            continue
         
         # แสดงผลค่าพิกัด x, y, z, r (จัดรูปแบบทศนิยม 2 ตำแหน่งเพื่อให้อ่านง่าย)
         x, y, z, r = current_pose[0], current_pose[1], current_pose[2], current_pose[3]
@@ -55,6 +103,6 @@ finally:
     # --- 3. ปิดการเชื่อมต่อ ---
     print("Closing connection to Dobot.")
     try:
-        device.close()
+        client.close()
     except:
         pass # ป้องกัน error ซ้ำซ้อน
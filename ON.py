@@ -0,0 +1,88 @@
+from ultralytics import YOLO
+import torch
+import os
+import cv2
+import numpy as np
+from camera import DETECT_IMGSZ  # ขนาดภาพที่ camera.py ใช้ตรวจจับ
+
+# --- 1. โหลดโมเดลที่เทรนมา ---
+model = YOLO("last.pt")
+
+# --- 2. Export เป็น ONNX (FP32, opset 12) ---
+model.export(format="onnx", imgsz=DETECT_IMGSZ, opset=12)
+
+# --- 2.1 Export เป็น TorchScript (ไม่ต้องติดตั้ง runtime เพิ่ม) ---
+# ได้ไฟล์ last.torchscript ซึ่ง camera.py จะเลือกโหลดเมื่อไม่มี TensorRT engine
+# ไม่ใช้ optimize=True เพราะเป็นการปรับสำหรับ mobile (CPU เท่านั้น) - โหลดขึ้น GPU ไม่ได้
+model.export(format="torchscript", imgsz=DETECT_IMGSZ)
+
+# --- 3. Export เป็น OpenVINO (FP32) สำหรับเครื่องที่ไม่มี GPU ---
+# ได้โฟลเดอร์ last_openvino_model/ ซึ่ง camera.py จะเลือกโหลดก่อนเมื่อรันบน CPU
+model.export(format="openvino", imgsz=DETECT_IMGSZ, half=False)
+
+# --- 4. Export เป็น TensorRT engine (FP16) สำหรับ GPU ---
+# camera.py จะเลือกโหลด last.engine ก่อนเสมอถ้ามีไฟล์นี้
+# INT8: ตั้ง ENGINE_INT8 = True และเตรียม calib.yaml ที่ชี้ไปยังภาพพัสดุใน parcel_images/
+ENGINE_INT8 = False
+CALIB_DATA = "calib.yaml"
+
+if torch.cuda.is_available():
+    if ENGINE_INT8:
+        model.export(format="engine", imgsz=DETECT_IMGSZ, device=0, workspace=4, int8=True, data=CALIB_DATA)
+    else:
+        model.export(format="engine", imgsz=DETECT_IMGSZ, device=0, workspace=4, half=True)
+else:
+    print("⚠️ ไม่พบ GPU (CUDA) - ข้ามการ export TensorRT engine")
+
+# --- 5. Quantize ONNX เป็น INT8 สำหรับ CPU (ใช้ภาพพัสดุจริงเป็นชุด calibration) ---
+# camera.py จะเลือกโหลด last.int8.onnx ก่อนเมื่อรันบน CPU
+CALIB_FOLDER = "parcel_images"
+CALIB_MAX_IMAGES = 300
+
+
+def letterbox_for_calibration(img: np.ndarray, size: int = DETECT_IMGSZ) -> np.ndarray:
+    """ย่อภาพแบบรักษาสัดส่วน + เติมขอบ แล้วแปลงเป็น tensor (1, 3, size, size) ค่า 0-1"""
+    h, w = img.shape[:2]
+    scale = size / max(h, w)
+    resized = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[:resized.shape[0], :resized.shape[1]] = resized
+    arr = canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0  # BGR -> RGB, HWC -> CHW
+    return np.ascontiguousarray(arr)
+
+
+try:
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                          QuantType, quantize_static)
+
+    class ParcelCalibrationReader(CalibrationDataReader):
+        """อ่านภาพพัสดุจาก parcel_images/ เพื่อใช้ calibrate ช่วงค่า activation"""
+
+        def __init__(self, folder: str, max_images: int = CALIB_MAX_IMAGES):
+            files = sorted(f for f in os.listdir(folder)
+                           if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))
+            self.paths = [os.path.join(folder, f) for f in files[:max_images]]
+            self.index = 0
+
+        def get_next(self):
+            while self.index < len(self.paths):
+                img = cv2.imread(self.paths[self.index])
+                self.index += 1
+                if img is not None:
+                    return {"images": letterbox_for_calibration(img)}
+            return None
+
+    if os.path.isdir(CALIB_FOLDER) and os.listdir(CALIB_FOLDER):
+        quantize_static(
+            "last.onnx", "last.int8.onnx",
+            calibration_data_reader=ParcelCalibrationReader(CALIB_FOLDER),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8
+        )
+        print("✅ สร้าง last.int8.onnx สำเร็จ")
+    else:
+        print(f"⚠️ ไม่พบภาพใน {CALIB_FOLDER}/ - ข้ามการ quantize INT8")
+
+except ImportError:
+    print("⚠️ ไม่พบ onnxruntime - ข้ามการ quantize INT8")
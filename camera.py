@@ -1,18 +1,152 @@
 import cv2
 import numpy as np
 import os
-from datetime import datetime
-from typing import Optional, Tuple, List
+import sys
+import math
+from typing import Optional, Tuple, List, Callable
 import time
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 import torch
 from ultralytics import YOLO # นำเข้าไลบรารี YOLO
 
 # กำหนด Path ของโมเดล YOLOv5 ที่คุณเทรนมา
 YOLO_MODEL_PATH = "last.pt" 
+# ตรวจสอบว่ามี GPU (CUDA) หรือไม่
+CUDA_AVAILABLE = torch.cuda.is_available()
+# ใช้ FP16 เฉพาะเมื่อมี GPU
+USE_HALF = CUDA_AVAILABLE
+
+# ตั้งค่า torch สำหรับ inference อย่างเดียว
+torch.set_grad_enabled(False)                    # ไม่ต้องเก็บ graph สำหรับ backprop
+torch.backends.cudnn.benchmark = True            # ขนาด input คงที่ - ให้ cuDNN เลือก algorithm ที่เร็วที่สุด
+torch.backends.cuda.matmul.allow_tf32 = True     # TF32 บน GPU ตระกูล Ampere ขึ้นไป
+torch.backends.cudnn.allow_tf32 = True
+if not CUDA_AVAILABLE:
+    # เหลือ core ไว้ให้ thread กล้อง/แสดงผล
+    torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+# ลำดับไฟล์โมเดลที่จะลองโหลด (ไฟล์ที่ export ด้วย ON.py เร็วกว่า .pt)
+# - GPU: TensorRT engine ก่อน แล้วจึง TorchScript
+# - CPU: ONNX INT8 / OpenVINO / ONNX Runtime เร็วกว่า PyTorch 2-3 เท่า
+if CUDA_AVAILABLE:
+    YOLO_MODEL_CANDIDATES = ["last.engine", "last.torchscript", "last.onnx", YOLO_MODEL_PATH]
+else:
+    YOLO_MODEL_CANDIDATES = ["last.int8.onnx", "last_openvino_model", "last.torchscript", "last.onnx", YOLO_MODEL_PATH]
 # กำหนด Class ID ของ 'parcel' ในโมเดลของคุณ (เช่น 0)
 PARCEL_CLASS_ID = 0 
 # กำหนดความเชื่อมั่นขั้นต่ำสำหรับการตรวจจับ
 CONFIDENCE_THRESHOLD = 0.5 
+# ขนาดภาพ (ด้านยาว) ที่ส่งเข้าโมเดล - เล็กลงเร็วขึ้น (ต้องตรงกับ imgsz ตอน export ใน ON.py)
+DETECT_IMGSZ = 416
+# พารามิเตอร์ predict (สร้างครั้งเดียว ใช้ทุกเฟรม)
+PREDICT_KWARGS = dict(imgsz=DETECT_IMGSZ, conf=CONFIDENCE_THRESHOLD, half=USE_HALF, verbose=False)
+# อัตราส่วนการย่อ ROI สำหรับโหมด Manual (0.25 = เหลือ 1/16 ของจำนวนพิกเซล)
+MANUAL_DETECT_SCALE = 0.25
+# วิธีตรวจจับในโหมด Manual: "edges" = นับพิกเซลขอบ (Canny), "mog2" = Background Subtraction,
+# "otsu" = threshold อัตโนมัติ (Otsu) แล้วนับพิกเซลสว่าง - เหมาะกับพัสดุสีอ่อนบนสายพานสีเข้ม
+# "luma" = นับพิกเซลที่สว่างกว่า LUMA_THRESHOLD ด้วย kernel เดียว (Numba ถ้ามี) - สำหรับเครื่องที่ OpenCV ไม่มี NEON/OpenCL เช่น Raspberry Pi
+MANUAL_METHODS = ("edges", "mog2", "otsu", "luma")
+LUMA_THRESHOLD = 128
+# ใช้ OpenCL (T-API / cv2.UMat) สำหรับโหมด Manual ถ้าเครื่องรองรับ (เช่น iGPU)
+USE_OPENCL = cv2.ocl.haveOpenCL()
+cv2.ocl.setUseOpenCL(USE_OPENCL)
+# ชื่อหน้าต่างแสดงผล
+WINDOW_NAME = 'Parcel Scanner'
+# Jetson (Tegra): HighGUI แบบ X11 copy ภาพช้ามาก - ใช้หน้าต่าง OpenGL แทน
+IS_JETSON = sys.platform.startswith('linux') and 'tegra' in os.uname().release
+# อ่านคีย์แบบไม่รอ (OpenCV >= 4.5) - เวอร์ชันเก่าใช้ waitKey(1)
+_poll_key = getattr(cv2, 'pollKey', None) or (lambda: cv2.waitKey(1))
+
+
+# Numba (ไม่บังคับ) - ถ้าไม่มีใช้ NumPy แทน
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _count_bright(roi, thr):
+        """นับพิกเซล (ทุก 2 แถว/คอลัมน์) ที่ค่าความสว่าง BT.601 มากกว่า thr"""
+        h, w = roi.shape[0] // 2, roi.shape[1] // 2
+        count = 0
+        for y in prange(h):
+            for x in range(w):
+                b = np.int32(roi[2 * y, 2 * x, 0])
+                g = np.int32(roi[2 * y, 2 * x, 1])
+                r = np.int32(roi[2 * y, 2 * x, 2])
+                if (77 * r + 150 * g + 29 * b) >> 8 > thr:
+                    count += 1
+        return count
+else:
+    def _count_bright(roi: np.ndarray, thr: int) -> int:
+        """นับพิกเซล (ทุก 2 แถว/คอลัมน์) ที่ค่าความสว่าง BT.601 มากกว่า thr"""
+        sub = roi[::2, ::2].astype(np.uint16)
+        luma = (29 * sub[..., 0] + 150 * sub[..., 1] + 77 * sub[..., 2]) >> 8
+        return int(np.count_nonzero(luma > thr))
+
+
+class CountsPerSec:
+    """นับจำนวนครั้งต่อวินาที (ใช้วัด FPS ของแต่ละ thread)"""
+    
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._count = 0
+    
+    def increment(self):
+        self._count += 1
+    
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self._start
+        return self._count / elapsed if elapsed > 0 else 0.0
+
+
+class FrameGrabber:
+    """Thread อ่านภาพจากกล้อง - เก็บเฉพาะเฟรมล่าสุด (เฟรมที่ยังไม่ถูกใช้จะถูกทับทิ้ง)"""
+    
+    def __init__(self, cap: cv2.VideoCapture):
+        self.cap = cap
+        self.frame = None
+        self.frame_id = 0
+        self.running = False
+        self.cond = threading.Condition()
+        self.fps = CountsPerSec()
+        self._thread = None
+    
+    def start(self) -> 'FrameGrabber':
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+    
+    def _loop(self):
+        while self.running:
+            # cap.read() ปล่อย GIL ระหว่างรอภาพ - thread อื่นทำงานต่อได้
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            with self.cond:
+                self.frame = frame
+                self.frame_id += 1
+                self.cond.notify_all()
+            self.fps.increment()
+        
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+    
+    def read(self, last_id: int, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], int]:
+        """รอเฟรมที่ใหม่กว่า last_id (ถ้าหมดเวลาหรือกล้องหยุด จะได้ frame_id เดิมกลับไป)"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.frame_id != last_id or not self.running, timeout)
+            return self.frame, self.frame_id
+    
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
 
 
 class ParcelCamera:
@@ -21,18 +155,44 @@ class ParcelCamera:
     def __init__(self, output_folder: str = "parcel_images", 
                  camera_index: int = 0,
                  auto_capture: bool = False,
-                 min_contour_area: int = 50000):
+                 min_contour_area: int = 50000,
+                 manual_detect_scale: float = MANUAL_DETECT_SCALE,
+                 detect_every: int = 3,
+                 manual_method: str = "edges"):
         """
         Args:
             output_folder: โฟลเดอร์สำหรับบันทึกภาพ
             camera_index: index ของกล้อง (0 = กล้องหลัก)
             auto_capture: ถ่ายภาพอัตโนมัติเมื่อตรวจจับวัตถุ
             min_contour_area: พื้นที่ขั้นต่ำสำหรับตรวจจับพัสดุ (ไม่ได้ใช้ในโหมด YOLO)
+            manual_detect_scale: อัตราส่วนย่อ ROI ก่อนตรวจจับในโหมด Manual (0.5 = 1/4 ของพิกเซล)
+            detect_every: ตรวจจับทุกๆ N เฟรม (เฟรมระหว่างนั้นใช้ผลเดิม)
+            manual_method: วิธีตรวจจับในโหมด Manual ("edges", "mog2", "otsu" หรือ "luma")
         """
         self.output_folder = output_folder
         self.camera_index = camera_index
         self.auto_capture = auto_capture
         self.min_contour_area = min_contour_area # เก็บไว้เผื่อใช้ในโหมด manual
+        self.manual_detect_scale = manual_detect_scale
+        # เกณฑ์บนภาพที่ย่อแล้ว (พื้นที่ลดลงตามกำลังสองของอัตราส่วน)
+        self._manual_min_area = min_contour_area * manual_detect_scale ** 2
+        # ถ้าอัตราส่วนเป็น 1/2, 1/4, ... โหมด "edges" ย่อด้วย pyrDown (Gaussian + ย่อครึ่งในคำสั่งเดียว)
+        levels = math.log2(1 / manual_detect_scale)
+        self._pyr_levels = int(levels) if levels >= 1 and levels.is_integer() else 0
+        self._pyr_bufs = [None] * self._pyr_levels
+        self._luma_min_area = min_contour_area * 0.25  # "luma" สุ่มทุก 2 พิกเซล = 1/4 ของพื้นที่
+        if manual_method not in MANUAL_METHODS:
+            raise ValueError(f"manual_method ต้องเป็นหนึ่งใน {MANUAL_METHODS}")
+        self.manual_method = manual_method
+        # Background Subtractor (ใช้เมื่อ manual_method="mog2") - เรียนรู้พื้นหลังของสายพานจากภาพ ROI ที่ย่อแล้ว
+        self.bg_sub = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=25, detectShadows=False)
+        self._open_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        # Scratch buffers ของโหมด Manual (ส่งเป็น dst= แล้วเก็บค่าที่คืนมา - OpenCV จองใหม่เองถ้าขนาดเปลี่ยน)
+        self._small_buf = None  # ROI ที่ย่อแล้ว
+        self._gray_buf = None   # grayscale ของ ROI ที่ย่อแล้ว
+        self._blur_buf = None   # ผล blur รอบแรก
+        self._fg_buf = None     # foreground mask จาก MOG2
+        self._bin_buf = None    # ภาพขาวดำสุดท้ายที่นำไปนับพิกเซล (edges / mask หลัง opening)
         
         # สร้างโฟลเดอร์ถ้ายังไม่มี
         if not os.path.exists(output_folder):
@@ -43,39 +203,156 @@ class ParcelCamera:
         self.cap = None
         self.is_running = False
         self.captured_images = []
+        # ชื่อไฟล์ภาพ: prefix ของ session + เลขลำดับ (ไม่ต้อง strftime ทุกครั้งที่ถ่าย และไม่ชนกัน)
+        self._session = time.strftime('%Y%m%d_%H%M%S')
+        self._img_ctr = itertools.count(1)  # next() ปลอดภัยเมื่อถ่ายจากหลาย thread
+        self._out_prefix = os.path.join(output_folder, "")  # path โฟลเดอร์พร้อมตัวคั่น - ต่อชื่อไฟล์ได้ทันที
         
         # Detection settings
         self.detection_cooldown = 2.0  # วินาที ก่อนจับภาพถัดไป
         self.last_capture_time = 0
+        self.detect_every = max(1, detect_every)
+        self._frame_idx = 0
         
         # ROI (Region of Interest) settings
         self.roi_percentage = 0.7  # 70% ของหน้าจอ
+        self._roi = None          # (x1, y1, x2, y2) ที่คำนวณไว้แล้ว
+        self._roi_shape = None    # (h, w) ที่ใช้คำนวณ _roi
+        
+        # UI buffers (สร้างครั้งเดียวแล้วใช้ซ้ำทุกเฟรม)
+        self._ui_buf = None     # สำเนาเฟรมสำหรับวาด UI
+        # ตารางผสมสีแถบบน/ล่าง: 0.3 * pixel + 0.7 * 40 (พื้นหลังเทาเข้ม) - ใช้ cv2.LUT แทน addWeighted
+        self._bar_lut = np.clip(np.arange(256) * 0.3 + 28, 0, 255).astype(np.uint8)
+        self._overlay_cache = {}  # ส่วน UI คงที่ที่วาดไว้ล่วงหน้า {(h, w, detected, auto): [(overlay, mask, region), ...]}
         
         # YOLOv5 Model Initialization
         self.model = None
         self.detected_parcels = [] # เก็บผลการตรวจจับในเฟรมปัจจุบัน
+        self._det_buf = None  # buffer ภาพย่อสำหรับส่งเข้าโมเดล (ใช้ซ้ำทุกเฟรม)
+        self._square_input = False  # โมเดลที่ export แล้ว (engine/onnx/openvino) รับ input ขนาดคงที่ DETECT_IMGSZ x DETECT_IMGSZ
         self.load_yolo_model()
+        
+        # Background inference (แยกการตรวจจับออกจาก loop แสดงผล)
+        self._lock = threading.Lock()           # ป้องกัน detected_parcels / _detected / _latest
+        self._latest = None                     # ช่องเก็บเฟรมล่าสุดสำหรับตรวจจับ (เขียนทับเสมอ ไม่ใช่ FIFO)
+        self._latest_ready = threading.Event()
+        self._detected = False
+        self._infer_thread = None
+        
+        # Thread อ่านภาพจากกล้อง + ตัววัด FPS ของ loop แสดงผล
+        self._grabber = None
+        self._display_fps = CountsPerSec()
+        
+        # Background JPEG writer (ไม่ให้ imwrite บล็อก loop หลัก) - encode JPEG ปล่อย GIL จึงเขียนได้ 2 ภาพพร้อมกัน
+        self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="img-writer")
+        # เรียกด้วย (jpeg_bytes, meta) ทันทีหลัง encode - ผู้ใช้ (เช่น pipeline) ส่งเข้า OCR ได้โดยไม่ต้องรอไฟล์
+        self.on_capture_callback: Optional[Callable[[bytes, dict], None]] = None
 
+    @property
+    def roi_percentage(self) -> float:
+        """ขนาดกรอบ ROI เทียบกับเฟรม (0-1)"""
+        return self._roi_percentage
+    
+    @roi_percentage.setter
+    def roi_percentage(self, value: float):
+        self._roi_percentage = value
+        # ล้างค่าที่คำนวณจาก ROI เดิม (ขอบเขต + UI ที่วาดไว้)
+        self._roi_shape = None
+        self._overlay_cache = {}
+    
     def load_yolo_model(self):
-        """โหลดโมเดล YOLOv5"""
+        """โหลดโมเดล YOLOv5 (เลือกไฟล์ที่เร็วที่สุดที่มีอยู่)"""
+        model_path = next((p for p in YOLO_MODEL_CANDIDATES if os.path.exists(p)), YOLO_MODEL_PATH)
         try:
-            # ใช้ ultralytics.YOLO เพื่อโหลดโมเดลที่เทรนมา
-            self.model = YOLO(YOLO_MODEL_PATH)
-            print(f"✅ โหลดโมเดล YOLOv5 '{YOLO_MODEL_PATH}' สำเร็จ")
+            # ใช้ ultralytics.YOLO เพื่อโหลดโมเดลที่เทรนมา (เลือก backend ตามนามสกุลไฟล์)
+            self.model = YOLO(model_path, task='detect')
+            self._square_input = not model_path.endswith('.pt')
+            print(f"✅ โหลดโมเดล YOLOv5 '{model_path}' สำเร็จ")
         except Exception as e:
             print(f"❌ ข้อผิดพลาดในการโหลดโมเดล YOLOv5: {e}")
             self.model = None
+            return
+        
+        if CUDA_AVAILABLE and not self._square_input:
+            # weights/activations เป็น FP16 บน GPU
+            self.model.model.half()
+            if hasattr(torch, 'compile'):
+                self._compile_model()
+    
+    def _compile_model(self):
+        """คอมไพล์โมเดล PyTorch ด้วย torch.compile (เฉพาะ .pt บน GPU) แล้ว warm-up ก่อนเข้า loop"""
+        original = self.model.model
+        try:
+            self.model.model = torch.compile(original, mode='reduce-overhead', fullgraph=False)
+            # เรียกครั้งแรกเพื่อให้คอมไพล์เสร็จก่อนเปิดหน้าจอ (ขนาดเดียวกับเฟรมกล้อง 1280x720)
+            tensor, _ = self._preprocess(np.zeros((720, 1280, 3), dtype=np.uint8))
+            for _ in self.model.predict(tensor, stream=True, **PREDICT_KWARGS):
+                pass
+            print("⚡ คอมไพล์โมเดลด้วย torch.compile สำเร็จ")
+        except Exception as e:
+            print(f"⚠️ torch.compile ไม่สำเร็จ ใช้โมเดลปกติแทน: {e}")
+            self.model.model = original
+    
+    def _preprocess(self, frame: np.ndarray) -> Tuple[torch.Tensor, float]:
+        """
+        เตรียม input ให้โมเดลด้วย OpenCV (ย่อ + เติมขอบ + normalize + BGR->RGB + HWC->CHW)
+        ส่งเป็น tensor เข้าโมเดลโดยตรง ultralytics จึงไม่ต้องทำ letterbox ซ้ำ
+        
+        Returns:
+            (tensor ขนาด (1, 3, H, W) ค่า 0-1, อัตราส่วนการย่อ)
+        """
+        h, w = frame.shape[:2]
+        
+        # ย่อภาพก่อนส่งเข้าโมเดล (ลดงานคำนวณ ~ (640/416)^2 เท่า)
+        scale = DETECT_IMGSZ / max(h, w)
+        small_size = (round(w * scale), round(h * scale))
+        if self._det_buf is None or self._det_buf.shape[1::-1] != small_size:
+            self._det_buf = np.empty((small_size[1], small_size[0], 3), dtype=np.uint8)
+        small = cv2.resize(frame, small_size, dst=self._det_buf, interpolation=cv2.INTER_LINEAR)
+        
+        # เติมขอบล่าง/ขวาให้ได้ขนาดที่โมเดลรับ (พิกัดกล่องจึงไม่ต้องเลื่อน)
+        # - โมเดล export: สี่เหลี่ยมจัตุรัสขนาดคงที่
+        # - โมเดล .pt: ปัดขึ้นเป็นทวีคูณของ stride 32 เท่านั้น (คำนวณน้อยกว่า)
+        if self._square_input:
+            pad_w, pad_h = DETECT_IMGSZ, DETECT_IMGSZ
+        else:
+            pad_w, pad_h = -(-small_size[0] // 32) * 32, -(-small_size[1] // 32) * 32
+        padded = cv2.copyMakeBorder(small, 0, pad_h - small_size[1], 0, pad_w - small_size[0],
+                                    cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        
+        # normalize + สลับช่องสี + เรียง CHW ในคำสั่งเดียว
+        blob = cv2.dnn.blobFromImage(padded, 1 / 255.0, swapRB=True)
+        return torch.from_numpy(blob), scale
     
     # ... (เมธอด initialize_camera, get_roi_bounds คงเดิม) ...
     def initialize_camera(self) -> bool:
         """เปิดกล้อง"""
+        # ให้ OpenCV ใช้หลาย core (เหลือ 1 core ไว้ให้ thread อ่านภาพ) และเปิด SIMD
+        cv2.setUseOptimized(True)
+        cv2.setNumThreads(max(1, (os.cpu_count() or 2) - 1))
+        cpu_features = [line.strip() for line in cv2.getBuildInformation().splitlines()
+                        if line.strip().startswith(("Baseline:", "Dispatched code:"))]
+        print(f"🧵 OpenCV threads: {cv2.getNumThreads()} | {' | '.join(cpu_features) or 'ไม่พบข้อมูล SIMD'}")
+        
         try:
-            self.cap = cv2.VideoCapture(self.camera_index)
+            # เลือก backend ตามระบบปฏิบัติการ (DirectShow บน Windows, V4L2 บน Linux)
+            if sys.platform.startswith('win'):
+                backend = cv2.CAP_DSHOW
+            elif sys.platform.startswith('linux'):
+                backend = cv2.CAP_V4L2
+            else:
+                backend = cv2.CAP_ANY
+            self.cap = cv2.VideoCapture(self.camera_index, backend)
             
             if not self.cap.isOpened():
                 print(f"❌ ไม่สามารถเปิดกล้อง index {self.camera_index}")
                 return False
             
+            # ขอภาพแบบ MJPG (บีบอัดจากกล้อง ลดข้อมูลผ่าน USB ~10 เท่า) - ต้องตั้งก่อนความละเอียด
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            # เก็บ buffer แค่ 1 เฟรม ไม่ให้ได้ภาพค้าง
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            
             # ตั้งค่าความละเอียด
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
@@ -88,7 +365,15 @@ class ParcelCamera:
             self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
             self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             
-            print(f"✅ เปิดกล้องสำเร็จ - ความละเอียด: {self.frame_width}x{self.frame_height}")
+            # คำนวณ ROI ไว้ล่วงหน้า (ความละเอียดคงที่หลังเปิดกล้อง)
+            self.get_roi_bounds((self.frame_height, self.frame_width, 3))
+            # จอง buffer สำหรับวาด UI ตามความละเอียดจริง
+            self._ui_buf = np.empty((self.frame_height, self.frame_width, 3), dtype=np.uint8)
+            
+            fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+            fourcc_str = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4))
+            
+            print(f"✅ เปิดกล้องสำเร็จ - ความละเอียด: {self.frame_width}x{self.frame_height} ({fourcc_str})")
             self.is_running = True
             return True
             
@@ -97,30 +382,42 @@ class ParcelCamera:
             return False
     
     def get_roi_bounds(self, frame_shape: Tuple[int, int]) -> Tuple[int, int, int, int]:
-        """คำนวณพื้นที่ ROI (กรอบสแกน)"""
-        h, w = frame_shape[:2]
+        """คำนวณพื้นที่ ROI (กรอบสแกน) - คำนวณใหม่เฉพาะเมื่อขนาดเฟรมเปลี่ยน"""
+        shape = frame_shape[:2]
+        if shape == self._roi_shape:
+            return self._roi
         
-        roi_w = int(w * self.roi_percentage)
-        roi_h = int(h * self.roi_percentage)
+        h, w = shape
+        
+        roi_w = int(w * self._roi_percentage)
+        roi_h = int(h * self._roi_percentage)
         
         x1 = (w - roi_w) // 2
         y1 = (h - roi_h) // 2
         x2 = x1 + roi_w
         y2 = y1 + roi_h
         
-        return x1, y1, x2, y2
+        self._roi = (x1, y1, x2, y2)
+        self._roi_shape = shape
+        return self._roi
 
-    def draw_roi_frame(self, frame: np.ndarray, detected: bool = False) -> np.ndarray:
-        """วาดกรอบ ROI, UI และ Bounding Boxes จาก YOLO"""
-        h, w = frame.shape[:2]
-        x1, y1, x2, y2 = self.get_roi_bounds(frame.shape)
+    def _build_static_overlay(self, frame_shape: Tuple[int, int], detected: bool) -> List[Tuple[np.ndarray, np.ndarray, tuple]]:
+        """
+        วาดส่วน UI ที่ไม่เปลี่ยนระหว่างเฟรม (กรอบ ROI, มุม, crosshair, ข้อความคงที่) ลงภาพ overlay ครั้งเดียว
+        
+        Returns:
+            รายการ (overlay, mask, region) เฉพาะบริเวณที่มีการวาด - mask เป็น True ในพิกเซลที่มีการวาด
+        """
+        h, w = frame_shape[:2]
+        overlay = np.zeros((h, w, 3), dtype=np.uint8)
+        x1, y1, x2, y2 = self.get_roi_bounds(frame_shape)
         
         # สีกรอบ (เขียว = ตรวจจับ, ฟ้า = ปกติ)
         color = (0, 255, 0) if detected else (255, 200, 0)
         thickness = 3 if detected else 2
         
         # วาดกรอบหลัก
-        cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+        cv2.rectangle(overlay, (x1, y1), (x2, y2), color, thickness)
         
         # วาดมุมเน้น (corner markers)
         corner_length = 40
@@ -133,48 +430,31 @@ class ParcelCamera:
         
         for i, (cx, cy) in enumerate(corners):
             if i == 0:  # บนซ้าย
-                cv2.line(frame, (cx, cy), (cx + corner_length, cy), color, corner_thickness)
-                cv2.line(frame, (cx, cy), (cx, cy + corner_length), color, corner_thickness)
+                cv2.line(overlay, (cx, cy), (cx + corner_length, cy), color, corner_thickness)
+                cv2.line(overlay, (cx, cy), (cx, cy + corner_length), color, corner_thickness)
             elif i == 1:  # บนขวา
-                cv2.line(frame, (cx, cy), (cx - corner_length, cy), color, corner_thickness)
-                cv2.line(frame, (cx, cy), (cx, cy + corner_length), color, corner_thickness)
+                cv2.line(overlay, (cx, cy), (cx - corner_length, cy), color, corner_thickness)
+                cv2.line(overlay, (cx, cy), (cx, cy + corner_length), color, corner_thickness)
             elif i == 2:  # ล่างซ้าย
-                cv2.line(frame, (cx, cy), (cx + corner_length, cy), color, corner_thickness)
-                cv2.line(frame, (cx, cy), (cx, cy - corner_length), color, corner_thickness)
+                cv2.line(overlay, (cx, cy), (cx + corner_length, cy), color, corner_thickness)
+                cv2.line(overlay, (cx, cy), (cx, cy - corner_length), color, corner_thickness)
             elif i == 3:  # ล่างขวา
-                cv2.line(frame, (cx, cy), (cx - corner_length, cy), color, corner_thickness)
-                cv2.line(frame, (cx, cy), (cx, cy - corner_length), color, corner_thickness)
+                cv2.line(overlay, (cx, cy), (cx - corner_length, cy), color, corner_thickness)
+                cv2.line(overlay, (cx, cy), (cx, cy - corner_length), color, corner_thickness)
         
         # เส้นกึ่งกลาง (crosshair)
         center_x, center_y = w // 2, h // 2
-        cv2.line(frame, (center_x - 20, center_y), (center_x + 20, center_y), (0, 255, 255), 2)
-        cv2.line(frame, (center_x, center_y - 20), (center_x, center_y + 20), (0, 255, 255), 2)
-        
-        # วาด Bounding Box ของ YOLO
-        for box in self.detected_parcels:
-            # box คือ [x1, y1, x2, y2, conf, cls] (แปลงเป็น int)
-            bx1, by1, bx2, by2 = map(int, box[:4])
-            conf = box[4]
-            # วาดสี่เหลี่ยม
-            cv2.rectangle(frame, (bx1, by1), (bx2, by2), (0, 255, 255), 2)
-            # แสดงความเชื่อมั่น
-            cv2.putText(frame, f"Parcel {conf:.2f}", (bx1, by1 - 10), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
-
-        # Text overlay - Header
-        header_bg = np.zeros((80, w, 3), dtype=np.uint8)
-        header_bg[:] = (40, 40, 40)
-        frame[0:80] = cv2.addWeighted(frame[0:80], 0.3, header_bg, 0.7, 0)
+        cv2.line(overlay, (center_x - 20, center_y), (center_x + 20, center_y), (0, 255, 255), 2)
+        cv2.line(overlay, (center_x, center_y - 20), (center_x, center_y + 20), (0, 255, 255), 2)
         
-        cv2.putText(frame, "PARCEL SCANNER (YOLOv5)", (20, 35), 
+        # Header
+        cv2.putText(overlay, "PARCEL SCANNER (YOLOv5)", (20, 35), 
                     cv2.FONT_HERSHEY_DUPLEX, 1.0, (255, 255, 255), 2)
-        cv2.putText(frame, f"Images: {len(self.captured_images)}", (20, 65), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
         
         # Status text
         if detected:
             status_text = "PARCEL DETECTED! (YOLO)"
-            cv2.putText(frame, status_text, (w - 350, 35), 
+            cv2.putText(overlay, status_text, (w - 350, 35), 
                         cv2.FONT_HERSHEY_DUPLEX, 0.8, (0, 255, 0), 2)
         
         # Instructions - Footer
@@ -186,19 +466,72 @@ class ParcelCamera:
             "Q/ESC: Exit"
         ]
         
-        footer_bg = np.zeros((100, w, 3), dtype=np.uint8)
-        footer_bg[:] = (40, 40, 40)
-        frame[footer_y:h] = cv2.addWeighted(frame[footer_y:h], 0.3, footer_bg, 0.7, 0)
-        
         for i, instruction in enumerate(instructions):
             x_pos = 20 + (i * 200)
-            cv2.putText(frame, instruction, (x_pos, footer_y + 30), 
+            cv2.putText(overlay, instruction, (x_pos, footer_y + 30), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         
         mode_text = f"Mode: {'AUTO (YOLO)' if self.auto_capture else 'MANUAL (Contour)'}"
-        cv2.putText(frame, mode_text, (w - 250, footer_y + 30), 
+        cv2.putText(overlay, mode_text, (w - 250, footer_y + 30), 
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 200, 0), 2)
         
+        mask = overlay.any(axis=2, keepdims=True)
+        
+        # แบ่งเป็นแถบเล็กๆ ที่มีการวาดจริง (แถบบน/ล่าง, ขอบ ROI 4 ด้าน, crosshair)
+        # ไม่ต้อง copy ทั้งเฟรมทุกครั้ง - พื้นที่กลาง ROI ว่างอยู่แล้ว
+        pad = corner_thickness + 2
+        edge = corner_length + pad
+        regions = [
+            (slice(0, 80), slice(0, w)),                                    # Header
+            (slice(footer_y, h), slice(0, w)),                              # Footer
+            (slice(y1 - pad, y1 + edge), slice(x1 - pad, x2 + pad)),        # ขอบบน
+            (slice(y2 - edge, y2 + pad), slice(x1 - pad, x2 + pad)),        # ขอบล่าง
+            (slice(y1 + edge, y2 - edge), slice(x1 - pad, x1 + pad)),       # ขอบซ้าย
+            (slice(y1 + edge, y2 - edge), slice(x2 - pad, x2 + pad)),       # ขอบขวา
+            (slice(center_y - 22, center_y + 23), slice(center_x - 22, center_x + 23)),  # crosshair
+        ]
+        parts = []
+        for ys, xs in regions:
+            ys = slice(max(ys.start, 0), min(ys.stop, h))
+            xs = slice(max(xs.start, 0), min(xs.stop, w))
+            if ys.start < ys.stop and xs.start < xs.stop:
+                parts.append((overlay[ys, xs], mask[ys, xs], (ys, xs)))
+        return parts
+
+    def draw_roi_frame(self, frame: np.ndarray, detected: bool = False) -> np.ndarray:
+        """วาดกรอบ ROI, UI และ Bounding Boxes จาก YOLO"""
+        h, w = frame.shape[:2]
+        
+        # แถบโปร่งแสงด้านบน/ล่าง (ผสมกับพื้นหลังคงที่ - ค้นตาราง uint8 ครั้งเดียว)
+        header = frame[0:80]
+        cv2.LUT(header, self._bar_lut, dst=header)
+        footer = frame[h - 100:h]
+        cv2.LUT(footer, self._bar_lut, dst=footer)
+        
+        # ส่วนคงที่: วาดไว้ล่วงหน้าแล้ว copy ทีเดียว (สร้างใหม่เมื่อขนาดเฟรม/โหมดเปลี่ยน)
+        key = (h, w, detected, self.auto_capture)
+        if key not in self._overlay_cache:
+            self._overlay_cache[key] = self._build_static_overlay(frame.shape, detected)
+        for overlay, mask, region in self._overlay_cache[key]:
+            np.copyto(frame[region], overlay, where=mask)
+        
+        # วาด Bounding Box ของ YOLO (ผลล่าสุดจาก thread ตรวจจับ)
+        with self._lock:
+            parcels = self.detected_parcels
+        for box in parcels:
+            # box คือ [x1, y1, x2, y2, conf, cls] (แปลงเป็น int)
+            bx1, by1, bx2, by2 = map(int, box[:4])
+            conf = box[4]
+            # วาดสี่เหลี่ยม
+            cv2.rectangle(frame, (bx1, by1), (bx2, by2), (0, 255, 255), 2)
+            # แสดงความเชื่อมั่น
+            cv2.putText(frame, f"Parcel {conf:.2f}", (bx1, by1 - 10), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+        
+        # จำนวนภาพ (เปลี่ยนทุกครั้งที่ถ่าย)
+        cv2.putText(frame, f"Images: {len(self.captured_images)}", (20, 65), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+        
         return frame
     
     def detect_parcel(self, frame: np.ndarray) -> Tuple[bool, Optional[np.ndarray]]:
@@ -207,69 +540,170 @@ class ParcelCamera:
         - โหมด Auto: ใช้ YOLOv5
         - โหมด Manual: ใช้ Contour Detection (จากโค้ดเดิม) เพื่อให้ยังทำงานได้
         """
-        self.detected_parcels = [] # เคลียร์ผลการตรวจจับเดิม
+        parcels = [] # ผลการตรวจจับของเฟรมนี้ - array (N, 6) ในโหมด YOLO (แทนที่ของเดิมทั้งชุดเมื่อเสร็จ)
         h, w = frame.shape[:2]
         
         if self.auto_capture and self.model:
-            # ตรวจจับด้วย YOLOv5
-            results = self.model(frame, verbose=False, conf=CONFIDENCE_THRESHOLD)
+            # เตรียม input (ย่อ + normalize) ด้วย OpenCV
+            tensor, scale = self._preprocess(frame)
+            
+            # ตรวจจับด้วย YOLOv5 (stream=True: ได้ผลเป็น generator ไม่ต้องสร้าง list, predictor เดิมถูกใช้ซ้ำ)
+            results = self.model.predict(tensor, stream=True, **PREDICT_KWARGS)
+            # ใช้ .boxes.data เพื่อดึงข้อมูล Bounding Box: [x1, y1, x2, y2, conf, cls]
+            data = [r.boxes.data for r in results]
             detected = False
 
-            if results and len(results) > 0:
-                # แปลงผลลัพธ์เป็น tensors (กรณีมี GPU) หรือใช้ผลลัพธ์จาก CPU
-                # ใช้ .boxes.data เพื่อดึงข้อมูล Bounding Box: [x1, y1, x2, y2, conf, cls]
-                for result in results:
-                    boxes = result.boxes.data.cpu().numpy() # ย้ายไป CPU และแปลงเป็น numpy
-                    
-                    for box in boxes:
-                        conf = box[4]
-                        cls = int(box[5])
-                        
-                        # ตรวจสอบว่าเป็น 'parcel' และมีความเชื่อมั่นสูงพอ
-                        if cls == PARCEL_CLASS_ID and conf >= CONFIDENCE_THRESHOLD:
-                            # ตรวจสอบว่า Bounding Box อยู่ภายใน ROI (Optional, เพื่อกรองการตรวจจับนอกพื้นที่)
-                            x1_roi, y1_roi, x2_roi, y2_roi = self.get_roi_bounds(frame.shape)
-                            
-                            bx1, by1, bx2, by2 = map(int, box[:4])
-                            
-                            # ตรวจสอบว่าจุดศูนย์กลางของกล่องอยู่ใน ROI (หรือใช้วิธีอื่นที่เหมาะสม)
-                            center_x, center_y = (bx1 + bx2) // 2, (by1 + by2) // 2
-                            
-                            if x1_roi <= center_x <= x2_roi and y1_roi <= center_y <= y2_roi:
-                                self.detected_parcels.append(box)
-                                detected = True
+            if data:
+                # รวมบน device แล้วย้ายมา CPU ครั้งเดียว
+                boxes = torch.cat(data).float().cpu().numpy()
+                
+                # แปลงพิกัดกลับเป็นขนาดเฟรมจริง
+                boxes[:, :4] /= scale
+                
+                # กรองทั้งชุดในครั้งเดียว: เป็น 'parcel', ความเชื่อมั่นสูงพอ และจุดศูนย์กลางอยู่ใน ROI
+                x1_roi, y1_roi, x2_roi, y2_roi = self.get_roi_bounds(frame.shape)
+                cx = (boxes[:, 0] + boxes[:, 2]) * 0.5
+                cy = (boxes[:, 1] + boxes[:, 3]) * 0.5
+                m = (boxes[:, 5] == PARCEL_CLASS_ID) & (boxes[:, 4] >= CONFIDENCE_THRESHOLD)
+                m &= (cx >= x1_roi) & (cx <= x2_roi) & (cy >= y1_roi) & (cy <= y2_roi)
+                
+                parcels = boxes[m]
+                detected = bool(m.any())
+            
+            with self._lock:
+                self.detected_parcels = parcels
                                 
             # ส่งคืนผลการตรวจจับและภาพเต็มเฟรม
             return detected, frame
         
         else:
-            # โหมด Manual - ใช้ Contour Detection เหมือนเดิม (เพื่อความเข้ากันได้)
+            # โหมด Manual - ตรวจจับบนภาพ ROI ที่ย่อแล้ว (ไม่ต้องใช้โมเดล)
             x1, y1, x2, y2 = self.get_roi_bounds(frame.shape)
             roi = frame[y1:y2, x1:x2]
             
-            # แปลงเป็น grayscale เฉพาะสำหรับการตรวจจับ
-            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-            
-            # ลด noise
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+            if self.manual_method == "luma":
+                # kernel เดียว: ย่อ (สุ่มทุก 2 พิกเซล) + grayscale + threshold + นับ ในการอ่านภาพรอบเดียว
+                area = _count_bright(roi, LUMA_THRESHOLD)
+                min_area = self._luma_min_area
+            else:
+                # ส่งขึ้น GPU ผ่าน UMat ครั้งเดียว - ขั้นตอนถัดไปทั้งหมด (resize ถึง countNonZero) รันบน OpenCL
+                src = cv2.UMat(roi) if USE_OPENCL else roi
+                
+                # ย่อ ROI ก่อน (ทุกขั้นตอนถัดไปทำงานกับพิกเซลน้อยลงตามกำลังสองของอัตราส่วน)
+                use_pyr = self.manual_method == "edges" and self._pyr_levels > 0
+                if use_pyr:
+                    # pyrDown ทีละครึ่ง - low-pass ในตัว จึงไม่ต้อง blur ก่อน Canny อีก
+                    small = src
+                    for i in range(self._pyr_levels):
+                        small = self._pyr_bufs[i] = cv2.pyrDown(small, dst=self._pyr_bufs[i])
+                else:
+                    small = self._small_buf = cv2.resize(src, None, dst=self._small_buf,
+                                                         fx=self.manual_detect_scale, fy=self.manual_detect_scale,
+                                                         interpolation=cv2.INTER_AREA)
+                
+                if self.manual_method == "mog2":
+                    # พิกเซลที่ต่างจากพื้นหลัง (ผ่านครั้งเดียว) แล้วลบจุด noise เล็กๆ ด้วย opening
+                    fg = self._fg_buf = self.bg_sub.apply(small, fgmask=self._fg_buf)
+                    mask = self._bin_buf = cv2.morphologyEx(fg, cv2.MORPH_OPEN, self._open_kernel, dst=self._bin_buf)
+                    area = cv2.countNonZero(mask)
+                elif self.manual_method == "otsu":
+                    # แยกวัตถุสว่างออกจากพื้นหลังด้วย threshold เดียว (ผ่านภาพครั้งเดียว)
+                    gray = self._gray_buf = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._gray_buf)
+                    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=self._bin_buf)
+                    self._bin_buf = bw
+                    area = cv2.countNonZero(bw)
+                else:
+                    # แปลงเป็น grayscale เฉพาะสำหรับการตรวจจับ (เขียนลง buffer เดิม - ไม่ต้องจองหน่วยความจำใหม่ทุกเฟรม)
+                    gray = self._gray_buf = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._gray_buf)
+                
+                    if use_pyr:
+                        blurred = gray  # pyrDown ลด noise ให้แล้ว
+                    else:
+                        # ลด noise - box blur 3x3 สองรอบ (ใกล้เคียง Gaussian 5x5 sigma ~1.1 แต่ถูกกว่า)
+                        # (รอบสองเขียนกลับลง gray buffer ซึ่งไม่ใช้แล้ว)
+                        tmp = self._blur_buf = cv2.blur(gray, (3, 3), dst=self._blur_buf)
+                        blurred = self._gray_buf = cv2.blur(tmp, (3, 3), dst=self._gray_buf)
+                
+                    # Edge detection
+                    edges = self._bin_buf = cv2.Canny(blurred, 50, 150, edges=self._bin_buf)
+                
+                    # นับพิกเซลขอบแทนการหา contour
+                    area = cv2.countNonZero(edges)
+                
+                min_area = self._manual_min_area
             
-            # Edge detection
-            edges = cv2.Canny(blurred, 50, 150)
+            # เกณฑ์ลดลงตามสัดส่วนพื้นที่ที่ย่อ
+            detected = area > min_area
             
-            # หา contours
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            with self._lock:
+                self.detected_parcels = parcels
             
-            # หา contour ที่ใหญ่ที่สุด
-            detected = False
+            return detected, roi # คืนค่าเป็นภาพ ROI เหมือนเดิม
+    
+    def _infer_loop(self):
+        """Worker Thread: ตรวจจับพัสดุจากเฟรมล่าสุด (ทำงานคู่ขนานกับการแสดงผล)"""
+        # grad mode เป็นค่าต่อ thread - ต้องปิดใน thread นี้ด้วย
+        torch.set_grad_enabled(False)
+        while self.is_running:
+            if not self._latest_ready.wait(timeout=0.5):
+                continue
+            # หยิบเฟรมล่าสุดแล้วเคลียร์ช่อง
+            with self._lock:
+                frame = self._latest
+                self._latest = None
+                self._latest_ready.clear()
+            if frame is None:
+                continue
             
-            if contours:
-                largest_contour = max(contours, key=cv2.contourArea)
-                area = cv2.contourArea(largest_contour)
+            try:
+                detected, _ = self.detect_parcel(frame)
                 
-                if area > self.min_contour_area:
-                    detected = True
+                with self._lock:
+                    self._detected = detected
+                
+                # Auto capture (ใช้เฟรมเดียวกับที่ตรวจจับได้)
+                if self.auto_capture and detected:
+                    self.capture_image(frame, auto=True)
             
-            return detected, roi # คืนค่าเป็นภาพ ROI เหมือนเดิม
+            except Exception as e:
+                print(f"⚠️ ข้อผิดพลาดในการตรวจจับ: {e}")
+    
+    @staticmethod
+    def _write_image(filepath: str, img: np.ndarray,
+                     on_encoded: Optional[Callable[[bytes, dict], None]] = None, meta: Optional[dict] = None):
+        """เขียนไฟล์ JPEG (รันใน thread pool) - ส่ง bytes ให้ on_encoded ก่อนเขียนลงดิสก์"""
+        try:
+            # encode ในหน่วยความจำ แล้วเขียนด้วย write ครั้งเดียว
+            ok, enc = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 95])
+            if not ok:
+                raise RuntimeError("JPEG encode ล้มเหลว")
+            
+            if on_encoded is not None:
+                try:
+                    on_encoded(enc.tobytes(), meta)
+                except Exception as e:
+                    print(f"⚠️ on_capture_callback ผิดพลาด: {e}")
+            
+            # เขียนลงไฟล์ชั่วคราวก่อน แล้ว rename - ตัวเฝ้าโฟลเดอร์จะไม่เห็นไฟล์ที่เขียนไม่ครบ
+            tmp_path = filepath + ".tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+            try:
+                try:
+                    # os.write อาจเขียนไม่ครบในครั้งเดียว - วนจนครบ ไม่งั้นจะ rename ไฟล์ JPEG ที่ขาดไปให้ OCR
+                    remaining = memoryview(enc).cast('B')
+                    while remaining:
+                        remaining = remaining[os.write(fd, remaining):]
+                finally:
+                    os.close(fd)
+                os.replace(tmp_path, filepath)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)  # ไม่ทิ้งไฟล์ .tmp ค้างไว้เมื่อเขียนไม่สำเร็จ
+                except OSError:
+                    pass
+                raise
+        except Exception as e:
+            print(f"❌ ไม่สามารถบันทึกภาพ: {e}")
     
     def capture_image(self, frame: np.ndarray, auto: bool = False) -> Optional[str]:
         """บันทึกภาพพัสดุ (บันทึกเฉพาะ ROI)"""
@@ -281,26 +715,28 @@ class ParcelCamera:
             self.last_capture_time = current_time
         
         # สร้างชื่อไฟล์
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        timestamp = f"{self._session}_{next(self._img_ctr):06d}"
         filename = f"parcel_{timestamp}.jpg"
-        filepath = os.path.join(self.output_folder, filename)
+        filepath = self._out_prefix + filename
         
         # บันทึกภาพ
         try:
             # Crop ROI
             x1, y1, x2, y2 = self.get_roi_bounds(frame.shape)
-            # ตัดภาพ ROI
-            roi = frame[y1:y2, x1:x2]
-            
-            # บันทึกด้วยคุณภาพสูง (บันทึกภาพ roi ต้นฉบับ)
-            cv2.imwrite(filepath, roi, [cv2.IMWRITE_JPEG_QUALITY, 95])
+            # ตัดภาพ ROI (copy ออกมา เพราะ slice เป็น view ของเฟรมที่จะถูกเขียนทับ)
+            roi = np.ascontiguousarray(frame[y1:y2, x1:x2])
             
-            self.captured_images.append({
+            info = {
                 'filename': filename,
                 'filepath': filepath,
                 'timestamp': timestamp,
                 'auto': auto
-            })
+            }
+            
+            # ส่งให้ thread เขียนไฟล์ (คุณภาพสูง บันทึกภาพ roi ต้นฉบับ)
+            self._io_pool.submit(self._write_image, filepath, roi, self.on_capture_callback, info)
+            
+            self.captured_images.append(info)
             
             print(f"📸 {'[AUTO]' if auto else '[MANUAL]'} บันทึกภาพ: {filename}")
             return filepath
@@ -343,30 +779,55 @@ class ParcelCamera:
         if self.auto_capture and not self.model:
              print("⚠️ **คำเตือน:** โมเดล YOLOv5 โหลดไม่สำเร็จ! Auto-capture จะไม่ทำงาน")
         
+        if IS_JETSON:
+            try:
+                cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_OPENGL)
+            except cv2.error:
+                # OpenCV ไม่ได้ build พร้อม OpenGL - ใช้หน้าต่างปกติ
+                cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_AUTOSIZE)
+        
+        # เริ่ม thread ตรวจจับ
+        self._infer_thread = threading.Thread(target=self._infer_loop, daemon=True)
+        self._infer_thread.start()
+        
+        # เริ่ม thread อ่านภาพ (loop นี้ทำแค่วาด UI + แสดงผล)
+        self._grabber = FrameGrabber(self.cap).start()
+        frame_id = 0
+        
         try:
             while self.is_running:
-                ret, frame = self.cap.read()
+                frame, new_id = self._grabber.read(frame_id)
                 
-                if not ret:
-                    print("❌ ไม่สามารถอ่านภาพจากกล้อง")
-                    break
+                if new_id == frame_id:
+                    if not self._grabber.running:
+                        print("❌ ไม่สามารถอ่านภาพจากกล้อง")
+                        break
+                    continue
+                frame_id = new_id
                 
-                # ตรวจจับพัสดุ
-                detected, _ = self.detect_parcel(frame) # ใช้ _ เพราะ YOLO ไม่ได้คืนค่า roi
+                # ส่งเฟรมให้ thread ตรวจจับทุกๆ N เฟรม (ทับเฟรมเก่าที่ยังไม่ได้ตรวจ - ตรวจเฟรมใหม่สุดเสมอ)
+                if self._frame_idx % self.detect_every == 0:
+                    with self._lock:
+                        self._latest = frame
+                        self._latest_ready.set()
+                self._frame_idx += 1
                 
-                # Auto capture
-                if self.auto_capture and detected:
-                    # ใช้ frame ต้นฉบับในการ capture
-                    self.capture_image(frame, auto=True) 
+                # ใช้ผลการตรวจจับล่าสุดที่มี
+                with self._lock:
+                    detected = self._detected
                 
-                # วาด UI
-                display_frame = self.draw_roi_frame(frame.copy(), detected)
+                # วาด UI ลงบน buffer ที่ใช้ซ้ำ (frame ต้นฉบับยังใช้ตรวจจับ/บันทึกภาพ)
+                if self._ui_buf is None or self._ui_buf.shape != frame.shape:
+                    self._ui_buf = np.empty_like(frame)
+                np.copyto(self._ui_buf, frame)
+                display_frame = self.draw_roi_frame(self._ui_buf, detected)
                 
                 # แสดงผล
-                cv2.imshow('Parcel Scanner', display_frame)
+                cv2.imshow(WINDOW_NAME, display_frame)
+                self._display_fps.increment()
                 
-                # รับคำสั่งจากคีย์บอร์ด
-                key = cv2.waitKey(1) & 0xFF
+                # รับคำสั่งจากคีย์บอร์ด (ไม่รอ - cap.read() เป็นตัวกำหนดจังหวะ loop อยู่แล้ว)
+                key = _poll_key() & 0xFF
                 
                 if key == ord(' '):  # Space - ถ่ายภาพ
                     self.capture_image(frame, auto=False)
@@ -395,6 +856,17 @@ class ParcelCamera:
         """ปิดกล้องและทำความสะอาด"""
         self.is_running = False
         
+        if self._infer_thread and self._infer_thread.is_alive():
+            self._infer_thread.join(timeout=2)
+        
+        # หยุด thread อ่านภาพก่อนปล่อยกล้อง
+        if self._grabber is not None:
+            self._grabber.stop()
+            print(f"📊 FPS เฉลี่ย - กล้อง: {self._grabber.fps.rate():.1f} | แสดงผล: {self._display_fps.rate():.1f}")
+        
+        # รอให้เขียนภาพที่ค้างอยู่จนเสร็จ
+        self._io_pool.shutdown(wait=True)
+        
         if self.cap is not None:
             self.cap.release()
         
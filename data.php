@@ -57,6 +57,11 @@ try {
             echo json_encode($result);
             break;
             
+        case 'create_parcels_bulk':
+            $result = createParcelsBulk($conn, $data['parcels'] ?? []);
+            echo json_encode($result);
+            break;
+            
         case 'get_parcel':
             $result = getParcel($conn, $data['tracking_number']);
             echo json_encode($result);
@@ -141,6 +146,79 @@ function createParcel($conn, $data) {
     }
 }
 
+function createParcelsBulk($conn, $parcels) {
+    // บันทึกหลายพัสดุใน request เดียว: prepare ครั้งเดียว แยก transaction ต่อพัสดุ
+    // (พัสดุที่ผิดพลาดไม่ทำให้รายการอื่น rollback ตาม)
+    $sender_stmt = $conn->prepare("
+        INSERT INTO bao_senders (name, phone, address_details, province) 
+        VALUES (?, ?, ?, ?)
+    ");
+    $recipient_stmt = $conn->prepare("
+        INSERT INTO bao_recipients (name, phone, address_details, province) 
+        VALUES (?, ?, ?, ?)
+    ");
+    $parcel_stmt = $conn->prepare("
+        INSERT INTO bao_parcels (sender_id, recipient_id, status) 
+        VALUES (?, ?, ?)
+    ");
+    
+    $results = [];
+    foreach ($parcels as $data) {
+        $conn->begin_transaction();
+        try {
+            $sender = $data['sender'];
+            $sender_stmt->bind_param('ssss', 
+                $sender['name'], 
+                $sender['phone'], 
+                $sender['address_details'], 
+                $sender['province']
+            );
+            $sender_stmt->execute();
+            $sender_id = $conn->insert_id;
+            
+            $recipient = $data['recipient'];
+            $recipient_stmt->bind_param('ssss', 
+                $recipient['name'], 
+                $recipient['phone'], 
+                $recipient['address_details'], 
+                $recipient['province']
+            );
+            $recipient_stmt->execute();
+            $recipient_id = $conn->insert_id;
+            
+            $parcel = $data['parcel'];
+            $parcel_stmt->bind_param('iis', 
+                $sender_id, 
+                $recipient_id, 
+                $parcel['status']
+            );
+            $parcel_stmt->execute();
+            $parcel_id = $conn->insert_id;
+            
+            $conn->commit();
+            
+            $results[] = [
+                'success' => true,
+                'parcel_id' => $parcel_id,
+                'sender_id' => $sender_id,
+                'recipient_id' => $recipient_id
+            ];
+        } catch (Exception $e) {
+            $conn->rollback();
+            $results[] = [
+                'success' => false,
+                'message' => $e->getMessage()
+            ];
+        }
+    }
+    
+    return [
+        'success' => true,
+        'message' => count($results) . ' parcels processed',
+        'results' => $results
+    ];
+}
+
 function getParcel($conn, $tracking_number) {
     // Implementation for getting parcel data
     return [
@@ -2,11 +2,17 @@
 """
 Dobot Controller - ควบคุมแขนกล Dobot สำหรับคัดแยกพัสดุ
 **แก้ไข:** เน้นการใช้ wait=True เพื่อให้แน่ใจว่า Dobot เคลื่อนที่ไปถึงตำแหน่งก่อนเริ่มคำสั่งถัดไป ลดปัญหาตำแหน่งคลาดเคลื่อน (Drift)
+ยกเว้นการเคลื่อนที่ผ่าน (ขึ้น/ลงระดับ SAFETY_Z) ที่ใช้ wait=False - คำสั่งต่อคิวใน Dobot ตามลำดับ
+และการลงหยิบ/ลงวางถัดไปยังรอ (wait=True) ให้ทุกคำสั่งก่อนหน้าเสร็จก่อนเสมอ
 """
 
 from pydobot import Dobot
 import time
-from typing import Optional, Dict, Tuple
+import logging
+from typing import Optional, Dict, Tuple, List
+
+# log ของการเคลื่อนที่แต่ละขั้นเป็น DEBUG (ปิดไว้ตอนใช้งานจริง - print ทุกคำสั่งทำให้แต่ละรอบช้าลงบน Windows console)
+log = logging.getLogger(__name__)
 
 class DobotController:
     """Class สำหรับควบคุมแขนกล Dobot"""
@@ -45,6 +51,11 @@ class DobotController:
         self.simulation_mode = simulation_mode
         self.dobot: Optional[Dobot] = None
         self.is_connected = False
+        self._last_z: Optional[float] = None  # ความสูงล่าสุดที่สั่ง (None = ไม่ทราบ)
+        
+        # พิกัดที่คำนวณไว้ล่วงหน้า: (จุดเหนือเป้าหมายที่ SAFETY_Z, จุดเป้าหมาย)
+        self._pickup_approach, self._pickup_place = self._approach_and_place(self.PICKUP)
+        self._drop_cache = {p: self._approach_and_place(c) for p, c in self.DROP_POINTS.items()}
         
         # สถิติ
         self.stats = {
@@ -54,6 +65,11 @@ class DobotController:
             'by_province': {}
         }
     
+    def _approach_and_place(self, point: list) -> Tuple[Tuple[float, float, float, float], Tuple[float, float, float, float]]:
+        """แปลงพิกัด [x, y, z, r] เป็น tuple (จุดเหนือเป้าหมาย, จุดเป้าหมาย)"""
+        x, y, z, r = point
+        return (x, y, self.SAFETY_Z, r), (x, y, z, r)
+    
     def connect(self) -> bool:
         """เชื่อมต่อกับ Dobot"""
         if self.simulation_mode:
@@ -107,24 +123,34 @@ class DobotController:
         เคลือนที่ไปยังตำแหน่งที่กำหนด **เน้น wait=True เพื่อความแม่นยำ**
         """
         if message:
-            print(f"  ➡️  {message} → ({x:.1f}, {y:.1f}, {z:.1f})")
+            log.debug("  ➡️  %s → (%.1f, %.1f, %.1f)", message, x, y, z)
         
         if self.simulation_mode:
-            time.sleep(0.3)  # จำลองเวลาการเคลื่อนที่
+            self._last_z = z
+            if wait:
+                time.sleep(0.3)  # จำลองเวลาการเคลื่อนที่
             return
         
         if self.dobot:
             try:
                 # สำคัญ: การใช้ wait=True เพื่อรอให้คำสั่งเคลื่อนที่ในคิวเสร็จสิ้น
                 self.dobot.move_to(x, y, z, r, wait=wait)
+                self._last_z = z
             except Exception as e:
-                print(f"  ⚠️ ข้อผิดพลาดในการเคลื่อนที่: {e}")
+                self._last_z = None
+                log.warning("  ⚠️ ข้อผิดพลาดในการเคลื่อนที่: %s", e)
         else:
-             print("  ❌ Dobot object is not initialized (Simulation mode or connection failed)")
+             log.error("  ❌ Dobot object is not initialized (Simulation mode or connection failed)")
+    
+    def lift_to_safety(self, approach: Tuple[float, float, float, float], message: str = ""):
+        """ยกขึ้นแนวตั้งไปที่ SAFETY_Z (ข้ามถ้าความสูงที่สั่งล่าสุดอยู่ที่/เหนือ SAFETY_Z แล้ว)"""
+        if self._last_z is not None and self._last_z >= self.SAFETY_Z - 1e-3:
+            return
+        self.move_to(*approach, message=message, wait=False)
     
     def suction_on(self):
         """เปิดหัวดูด"""
-        print("  🔵 เปิดหัวดูด")
+        log.debug("  🔵 เปิดหัวดูด")
         
         if self.simulation_mode:
             time.sleep(self.SUCTION_DELAY)
@@ -135,11 +161,11 @@ class DobotController:
                 self.dobot.suck(True)
                 time.sleep(self.SUCTION_DELAY)
             except Exception as e:
-                print(f"  ⚠️ ข้อผิดพลาดในการเปิดหัวดูด: {e}")
+                log.warning("  ⚠️ ข้อผิดพลาดในการเปิดหัวดูด: %s", e)
     
     def suction_off(self):
         """ปิดหัวดูด"""
-        print("  🔴 ปิดหัวดูด")
+        log.debug("  🔴 ปิดหัวดูด")
         
         if self.simulation_mode:
             time.sleep(self.SUCTION_DELAY)
@@ -150,7 +176,7 @@ class DobotController:
                 self.dobot.suck(False)
                 time.sleep(self.SUCTION_DELAY)
             except Exception as e:
-                print(f"  ⚠️ ข้อผิดพลาดในการปิดหัวดูด: {e}")
+                log.warning("  ⚠️ ข้อผิดพลาดในการปิดหัวดูด: %s", e)
     
     def move_home(self, message: str = ""):
         """กลับตำแหน่ง Home"""
@@ -160,40 +186,30 @@ class DobotController:
     
     def move_to_pickup(self):
         """ไปยังตำแหน่งหยิบพัสดุ (Pick Sequence)"""
-        # 1. ขึ้นไปเหนือจุดหยิบ (SAFETY_Z)
-        self.move_to(
-            self.PICKUP[0], 
-            self.PICKUP[1], 
-            self.SAFETY_Z, 
-            self.PICKUP[3],
-            "เหนือจุดหยิบพัสดุ (Safety Z)"
-        )
+        # 1. ขึ้นไปเหนือจุดหยิบ (SAFETY_Z) - เคลื่อนที่ผ่าน ไม่ต้องรอ
+        self.move_to(*self._pickup_approach, message="เหนือจุดหยิบพัสดุ (Safety Z)", wait=False)
         
-        # 2. ลงไปหยิบ
-        self.move_to(*self.PICKUP, message="ลงหยิบพัสดุ")
+        # 2. ลงไปหยิบ (รอจนถึงจริงก่อนเปิดหัวดูด)
+        self.move_to(*self._pickup_place, message="ลงหยิบพัสดุ")
     
     def move_to_drop(self, province: str) -> bool:
         """
         ไปยังตำแหน่งวางพัสดุตามจังหวัด (Drop Sequence)
         """
         # ค้นหาจุดวาง
-        drop_point = self.DROP_POINTS.get(province)
+        drop_point = self._drop_cache.get(province)
         
         if not drop_point:
-            print(f"  ❌ ไม่พบจุดวางสำหรับ '{province}'")
+            log.warning("  ❌ ไม่พบจุดวางสำหรับ '%s'", province)
             return False
         
-        # 1. ขึ้นไปเหนือจุดวาง (SAFETY_Z)
-        self.move_to(
-            drop_point[0],
-            drop_point[1],
-            self.SAFETY_Z,
-            drop_point[3],
-            f"เหนือจุดวาง '{province}' (Safety Z)"
-        )
+        approach, place = drop_point
         
-        # 2. ลงไปวาง
-        self.move_to(*drop_point, message=f"ลงวางพัสดุที่ '{province}'")
+        # 1. ขึ้นไปเหนือจุดวาง (SAFETY_Z) - เคลื่อนที่ผ่าน ไม่ต้องรอ
+        self.move_to(*approach, message=f"เหนือจุดวาง '{province}' (Safety Z)", wait=False)
+        
+        # 2. ลงไปวาง (รอจนถึงจริงก่อนปิดหัวดูด)
+        self.move_to(*place, message=f"ลงวางพัสดุที่ '{province}'")
         
         return True
     
@@ -202,37 +218,29 @@ class DobotController:
         หยิบพัสดุและวางตามจังหวัด (กระบวนการหลัก)
         """
         if not self.is_connected:
-            print("❌ Dobot ไม่ได้เชื่อมต่อ")
+            log.error("❌ Dobot ไม่ได้เชื่อมต่อ")
             return False
         
-        print(f"\n{'='*60}")
-        print(f"🤖 เริ่มกระบวนการคัดแยก → '{province}'")
-        print(f"{'='*60}")
+        log.info("🤖 เริ่มกระบวนการคัดแยก → '%s'", province)
         
         try:
             # 1. ไปหยิบ
-            print("📦 [1/5] เคลื่อนที่ไปยังจุดหยิบ...")
+            log.debug("📦 [1/5] เคลื่อนที่ไปยังจุดหยิบ...")
             self.move_to_pickup()
             
-            print("📦 [2/5] หยิบพัสดุ...")
+            log.debug("📦 [2/5] หยิบพัสดุ...")
             self.suction_on()
             
             # ยกขึ้นหลังหยิบ (กลับไปที่ SAFETY_Z ก่อนเคลื่อนที่ไปวาง)
-            self.move_to(
-                self.PICKUP[0],
-                self.PICKUP[1],
-                self.SAFETY_Z,
-                self.PICKUP[3],
-                "ยกพัสดุขึ้น (Safety)"
-            )
+            self.lift_to_safety(self._pickup_approach, "ยกพัสดุขึ้น (Safety)")
             
             # 2. ตรวจสอบและไปวาง
-            target_province = province if province in self.DROP_POINTS else "จุดสำรอง"
+            target_province = province if province in self._drop_cache else "จุดสำรอง"
             
-            print(f"📦 [3/5] ค้นหา/ยืนยันจุดวาง '{target_province}'...")
+            log.debug("📦 [3/5] ค้นหา/ยืนยันจุดวาง '%s'...", target_province)
             
             # 3. ไปวาง
-            print(f"📦 [4/5] เคลื่อนที่ไปยังจุดวาง '{target_province}'...")
+            log.debug("📦 [4/5] เคลื่อนที่ไปยังจุดวาง '%s'...", target_province)
             success = self.move_to_drop(target_province)
             
             if not success:
@@ -240,30 +248,23 @@ class DobotController:
                 self.stats['failed_drops'] += 1
                 return False
             
-            print("📦 [5/5] วางพัสดุ...")
+            log.debug("📦 [5/5] วางพัสดุ...")
             self.suction_off()
             
             # ยกขึ้นหลังวาง (กลับไปที่ SAFETY_Z ก่อนกลับ Home)
-            drop_point = self.DROP_POINTS[target_province]
-            self.move_to(
-                drop_point[0],
-                drop_point[1],
-                self.SAFETY_Z,
-                drop_point[3],
-                "ยกขึ้นหลังวาง (Safety)"
-            )
+            self.lift_to_safety(self._drop_cache[target_province][0], "ยกขึ้นหลังวาง (Safety)")
             
             # อัพเดทสถิติ
             self.stats['total_picks'] += 1
             self.stats['successful_drops'] += 1
             self.stats['by_province'][target_province] = self.stats['by_province'].get(target_province, 0) + 1
             
-            print(f"✅ คัดแยกพัสดุไปยัง '{target_province}' สำเร็จ!")
+            log.info("✅ คัดแยกพัสดุไปยัง '%s' สำเร็จ!", target_province)
             
             return True
             
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาดในกระบวนการคัดแยก: {e}")
+            log.error("❌ เกิดข้อผิดพลาดในกระบวนการคัดแยก: %s", e)
             
             # Emergency: ปิดหัวดูดและกลับ Home (ถ้าทำได้)
             try:
@@ -275,12 +276,20 @@ class DobotController:
             self.stats['failed_drops'] += 1
             return False
     
+    def pick_and_place_batch(self, province: str, count: int) -> List[bool]:
+        """
+        หยิบพัสดุที่ไปจังหวัดเดียวกัน count ชิ้นต่อเนื่องกัน โดยไม่กลับ Home ระหว่างชิ้น
+        (ผู้เรียกสั่ง move_home เองหลังจบชุด) - คืนผลของแต่ละชิ้นตามลำดับ
+        """
+        return [self.pick_and_place(province) for _ in range(count)]
+    
     def add_drop_point(self, province: str, coordinates: list):
         """
         เพิ่มจุดวางใหม่ (เผื่อไว้สำหรับการขยายจังหวัดในอนาคต)
         """
         if len(coordinates) == 4 and all(isinstance(c, (int, float)) for c in coordinates):
             self.DROP_POINTS[province] = coordinates
+            self._drop_cache[province] = self._approach_and_place(coordinates)
             print(f"✅ เพิ่มจุดวาง '{province}' → {coordinates}")
         else:
             print("❌ พิกัดต้องเป็น list ที่มี 4 องค์ประกอบ: [x, y, z, r]")
@@ -310,6 +319,9 @@ class DobotController:
 def test_dobot():
     """ฟังก์ชันทดสอบการทำงานของ Dobot"""
     
+    # แสดงทุกขั้นการเคลื่อนที่ตอนทดสอบ
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    
     print("🧪 ทดสอบการทำงานของ Dobot Controller")
     print("="*60)
     
@@ -5,43 +5,125 @@ Camera → OCR Processing → Dobot Sorting → Database
 """
 
 import os
+import sys
 import time
+import functools
+import logging
 import threading
-from queue import Queue
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue, SimpleQueue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Import modules
 from camera import ParcelCamera
-from process import CompleteParcelSortingSystem
+from process import CompleteParcelSortingSystem, ParcelResult, is_image_file
 from dobot_controller import DobotController
 
+log = logging.getLogger(__name__)
+
+# watchdog (ถ้ามี): รับ event ไฟล์ใหม่จาก OS (inotify / ReadDirectoryChangesW) แทนการวน listdir
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+DOBOT_MAX_BATCH = 8  # จำนวนพัสดุจังหวัดเดียวกันสูงสุดที่หยิบต่อเนื่องก่อนกลับ Home
+SEEN_FILES_MAX = 4096  # จำนวนไฟล์ล่าสุดที่จำไว้กันส่ง OCR ซ้ำ
+
+
+@functools.cache
+def _env() -> dict:
+    """อ่าน .env ครั้งเดียวต่อ process แล้วคืน snapshot ของ environment"""
+    load_dotenv()
+    return dict(os.environ)
+
+
+if WATCHDOG_AVAILABLE:
+    class NewImageHandler(FileSystemEventHandler):
+        """ส่ง path ของไฟล์ที่ถูกสร้าง/ย้ายเข้ามาในโฟลเดอร์ภาพต่อให้ callback"""
+
+        def __init__(self, on_image):
+            super().__init__()
+            self.on_image = on_image
+
+        def on_created(self, event):
+            if not event.is_directory:
+                self.on_image(event.src_path)
+
+        def on_moved(self, event):
+            # camera.py เขียนไฟล์ .tmp แล้ว os.replace เป็น .jpg จึงมาเป็น event moved
+            if not event.is_directory:
+                self.on_image(event.dest_path)
+
 
 class CompleteSortingPipeline:
     """ระบบ Pipeline แบบครบวงจร: Camera → OCR → Dobot → Database"""
     
+    # ส่วนต่าง ๆ ของตารางสถิติ (ประกอบเป็น template เดียวใน _build_stats_template)
+    _STATS_HEAD = (
+        "\n" + "="*60 + "\n"
+        "📊 สถิติการทำงาน\n"
+        + "="*60 + "\n"
+        "📸 ภาพที่ถ่าย:       {images_captured}\n"
+        "🔍 OCR ประมวลผล:     {ocr_processed}\n"
+        "   ✅ สำเร็จ:         {ocr_success}\n"
+        "   ❌ ล้มเหลว:       {ocr_failed}\n"
+    )
+    _STATS_DOBOT = (
+        "🤖 Dobot คัดแยก:     {dobot_sorted}\n"
+        "   ❌ ล้มเหลว:       {dobot_failed}\n"
+    )
+    _STATS_DB = "💾 Database:         {db_saved} (ล้มเหลว: {db_failed})\n"
+    _STATS_PENDING = (
+        "📋 รอประมวลผล:\n"
+        "   OCR Queue:        {ocr_pending}\n"
+    )
+    _STATS_DOBOT_PENDING = "   Dobot Queue:      {dobot_pending}\n"
+    
+    # worker threads อ่าน attribute เหล่านี้ทุกรอบ - ใช้ slots แทน __dict__
+    __slots__ = (
+        'config', 'typhoon_api_key', 'db_api_url', 'db_api_key',
+        'image_folder', '_image_dir', 'processed_folder', 'output_folder',
+        'camera_index', 'auto_capture', 'detect_every',
+        'enhance_images', 'save_to_db', 'ocr_workers',
+        'enable_dobot', 'dobot_port', 'dobot_speed', 'dobot_simulation',
+        'auto_process', 'process_interval',
+        'dobot_queue', 'camera', 'ocr_processor', 'dobot_controller', 'ocr_pool', 'move_pool',
+        'dobot_thread', 'monitor_thread', 'observer', '_seen', '_claimed', '_stop',
+        '_stats_lock', '_ocr_pending', '_last_stats_print', '_stats_template', 'stats',
+    )
+    
     def __init__(self, config: dict = None):
         # โหลดค่า configuration
-        load_dotenv()
+        env = _env()
         
         self.config = config or {}
         
         # --- API Keys ---
-        self.typhoon_api_key = self.config.get('typhoon_api_key') or os.getenv("TYPHOON_API_KEY")
-        self.db_api_url = self.config.get('db_api_url') or os.getenv("DB_API_URL")
-        self.db_api_key = self.config.get('db_api_key') or os.getenv("DB_API_KEY")
+        self.typhoon_api_key = self.config.get('typhoon_api_key') or env.get("TYPHOON_API_KEY")
+        self.db_api_url = self.config.get('db_api_url') or env.get("DB_API_URL")
+        self.db_api_key = self.config.get('db_api_key') or env.get("DB_API_KEY")
         
         # --- Folders ---
         self.image_folder = self.config.get('image_folder', "parcel_images")
+        self._image_dir = os.path.abspath(self.image_folder)  # ใช้เทียบกับ path จาก event
+        self.processed_folder = os.path.join(self.image_folder, "processed")
         self.output_folder = self.config.get('output_folder', "parcel_results")
         
         # --- Camera Settings ---
         self.camera_index = self.config.get('camera_index', 0)
         self.auto_capture = self.config.get('auto_capture', False)
+        self.detect_every = self.config.get('detect_every', 3)
         
         # --- OCR Settings ---
         self.enhance_images = self.config.get('enhance_images', True)
         self.save_to_db = self.config.get('save_to_db', False)
+        self.ocr_workers = self.config.get('ocr_workers', 4)
         
         # --- Dobot Settings ---
         self.enable_dobot = self.config.get('enable_dobot', True)
@@ -54,21 +136,28 @@ class CompleteSortingPipeline:
         self.process_interval = self.config.get('process_interval', 2)
         
         # --- Queues ---
-        self.ocr_queue = Queue()      # Queue สำหรับ OCR
         self.dobot_queue = Queue()    # Queue สำหรับ Dobot
         
         # --- Components ---
         self.camera = None
         self.ocr_processor = None
         self.dobot_controller = None
+        self.ocr_pool = None          # ThreadPoolExecutor สำหรับ OCR (เรียก API พร้อมกันได้หลายภาพ)
+        self.move_pool = None         # thread เดียวสำหรับย้ายภาพไป processed/ (ไม่ให้ Dobot worker รอ I/O)
         
         # --- Threading ---
-        self.ocr_thread = None
         self.dobot_thread = None
         self.monitor_thread = None
-        self.is_running = False
+        self.observer = None          # watchdog Observer (ใช้แทน monitor_thread เมื่อมี watchdog)
+        self._seen = OrderedDict()    # LRU ของ (st_dev, st_ino, st_mtime_ns, st_size) ที่ส่ง OCR แล้ว
+        self._claimed = set()         # path ที่กล้องส่ง bytes เข้า OCR แล้ว (monitor ต้องข้ามไฟล์นี้)
+        self._stop = threading.Event()  # set() แล้วทุก thread ที่รออยู่ตื่นทันที
         
         # --- Statistics ---
+        self._stats_lock = threading.Lock()  # stats ถูกแก้จากหลาย thread
+        self._ocr_pending = 0                 # จำนวนภาพที่ส่งเข้า OCR แล้วแต่ยังไม่เสร็จ
+        self._last_stats_print = 0.0          # เวลา (monotonic) ที่แสดงสถิติครั้งล่าสุด
+        self._stats_template = None           # สร้างหลังตรวจ config (save_to_db อาจถูกปิด)
         self.stats = {
             'images_captured': 0,
             'ocr_processed': 0,
@@ -138,8 +227,12 @@ class CompleteSortingPipeline:
         self.camera = ParcelCamera(
             output_folder=self.image_folder,
             camera_index=self.camera_index,
-            auto_capture=self.auto_capture
+            auto_capture=self.auto_capture,
+            detect_every=self.detect_every
         )
+        if self.auto_process:
+            # ภาพที่ถ่ายจากกล้องเข้า OCR จาก bytes ในหน่วยความจำทันที ไฟล์บนดิสก์เป็นแค่สำเนาเก็บไว้
+            self.camera.on_capture_callback = self._on_camera_capture
         
         # 2. OCR Processor
         print("🔍 [2/3] เตรียมระบบ OCR...")
@@ -147,8 +240,10 @@ class CompleteSortingPipeline:
             typhoon_api_key=self.typhoon_api_key,
             output_folder=self.output_folder,
             db_api_url=self.db_api_url if self.save_to_db else None,
-            db_api_key=self.db_api_key if self.save_to_db else None
+            db_api_key=self.db_api_key if self.save_to_db else None,
+            ocr_pool_size=self.ocr_workers  # connection ต่อ API เท่ากับจำนวน OCR thread
         )
+        self.ocr_pool = ThreadPoolExecutor(max_workers=self.ocr_workers, thread_name_prefix='ocr')
         
         # 3. Dobot Controller
         if self.enable_dobot:
@@ -166,201 +261,305 @@ class CompleteSortingPipeline:
         else:
             print("⚠️  [3/3] ข้าม Dobot Controller")
         
+        # โฟลเดอร์ภาพที่คัดแยกแล้ว (สร้างครั้งเดียว ไม่ต้องตรวจทุกครั้งที่ย้ายภาพ)
+        os.makedirs(self.processed_folder, exist_ok=True)
+        self.move_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='move')
+        
         print("="*60)
         print("✅ เตรียมระบบเสร็จสมบูรณ์")
     
-    def ocr_worker(self):
-        """Worker Thread: ประมวลผล OCR"""
-        print("🔄 เริ่ม OCR Worker Thread")
+    def submit_ocr(self, image_path: str, image_bytes: bytes = None):
+        """ส่งภาพเข้า OCR pool (ประมวลผลพร้อมกันได้สูงสุด ocr_workers ภาพ)"""
+        with self._stats_lock:
+            self._ocr_pending += 1
+        future = self.ocr_pool.submit(self._ocr_one, image_path, image_bytes)
+        future.add_done_callback(self._on_ocr_done)
+    
+    def _on_camera_capture(self, jpeg_bytes: bytes, meta: dict):
+        """Callback จากกล้อง (thread เขียนไฟล์): ส่ง JPEG เข้า OCR ก่อนไฟล์ถูกเขียนลงดิสก์"""
+        filepath = meta['filepath']
+        with self._stats_lock:
+            self._claimed.add(os.path.abspath(filepath))
+            self.stats['images_captured'] += 1
+        self.submit_ocr(filepath, jpeg_bytes)
+        log.info("\n📸 ภาพใหม่จากกล้อง: %s\n   📋 OCR Queue: %d\n   🤖 Dobot Queue: %d",
+                 meta['filename'], self._ocr_pending, self.dobot_queue.qsize())
+    
+    def _ocr_one(self, image_path: str, image_bytes: bytes = None):
+        """งานใน OCR pool: ประมวลผล OCR ภาพเดียว"""
+        # รอไฟล์เขียนเสร็จใน pool thread เพื่อไม่ให้ monitor ต้องหยุดรอทีละไฟล์
+        if image_bytes is None and not self._wait_file_stable(image_path):
+            return image_path, ParcelResult(
+                image_file=os.path.basename(image_path),
+                image_path=image_path,
+                timestamp=datetime.now().isoformat(),
+                error='ไม่พบไฟล์ภาพหรือไฟล์ว่าง'
+            )
         
-        while self.is_running:
-            try:
-                if not self.ocr_queue.empty():
-                    image_path = self.ocr_queue.get()
-                    
-                    print(f"\n{'='*60}")
-                    print(f"🔍 OCR: {os.path.basename(image_path)}")
-                    print(f"{'='*60}")
-                    
-                    # ประมวลผล OCR
-                    result = self.ocr_processor.process_single_parcel(
-                        image_path=image_path,
-                        enhance_image=self.enhance_images,
-                        save_to_db=self.save_to_db
-                    )
-                    
-                    # อัพเดทสถิติ
-                    self.stats['ocr_processed'] += 1
-                    
-                    if result['success']:
-                        self.stats['ocr_success'] += 1
-                        
-                        province = result.get('province')
-                        tracking = result.get('tracking_number')
-                        
-                        print(f"\n✅ OCR สำเร็จ!")
-                        print(f"   📦 Tracking: {tracking}")
-                        print(f"   📍 ปลายทาง: {province}")
-                        
-                        if result.get('db_saved'):
-                            self.stats['db_saved'] += 1
-                            print(f"   💾 Database ID: {result['db_parcel_id']}")
-                        
-                        # ส่งต่อไปยัง Dobot Queue
-                        if self.enable_dobot and province and province != 'ไม่ระบุ':
-                            self.dobot_queue.put({
-                                'image_path': image_path,
-                                'province': province,
-                                'tracking': tracking,
-                                'result': result
-                            })
-                            print(f"   🤖 ส่งต่อไปยัง Dobot Queue")
-                        else:
-                            print(f"   ⚠️  ข้าม Dobot (ไม่ระบุจังหวัด หรือปิดใช้)")
-                    
-                    else:
-                        self.stats['ocr_failed'] += 1
-                        print(f"\n❌ OCR ล้มเหลว: {result.get('error')}")
-                    
-                    self.ocr_queue.task_done()
-                    self.print_stats()
-                
-                else:
-                    time.sleep(0.5)
+        log.info("\n%s\n🔍 OCR: %s\n%s", '='*60, os.path.basename(image_path), '='*60)
+        
+        result = self.ocr_processor.process_single_parcel(
+            image_path=image_path,
+            enhance_image=self.enhance_images,
+            save_to_db=self.save_to_db,
+            image_bytes=image_bytes
+        )
+        return image_path, result
+    
+    def _on_ocr_done(self, future):
+        """Callback เมื่อ OCR เสร็จ: อัพเดทสถิติและส่งต่อไปยัง Dobot Queue"""
+        try:
+            image_path, result = future.result()
+        except Exception as e:
+            with self._stats_lock:
+                self._ocr_pending -= 1
+                self.stats['ocr_processed'] += 1
+                self.stats['ocr_failed'] += 1
+            log.error("❌ ข้อผิดพลาดใน OCR Worker: %s", e, exc_info=e)
+            return
+        
+        # อัพเดทสถิติ
+        with self._stats_lock:
+            self._ocr_pending -= 1
+            self.stats['ocr_processed'] += 1
+            if result.success:
+                self.stats['ocr_success'] += 1
+                if result.db_saved:
+                    self.stats['db_saved'] += 1
+            else:
+                self.stats['ocr_failed'] += 1
+        
+        if result.success:
+            province = result.province
+            tracking = result.tracking_number
             
-            except Exception as e:
-                print(f"❌ ข้อผิดพลาดใน OCR Worker: {e}")
-                import traceback
-                traceback.print_exc()
-                time.sleep(1)
+            log.info("\n✅ OCR สำเร็จ!\n   📦 Tracking: %s\n   📍 ปลายทาง: %s", tracking, province)
+            
+            if result.db_saved:
+                log.info("   💾 Database ID: %s", result.db_parcel_id)
+            
+            # ส่งต่อไปยัง Dobot Queue
+            if self.enable_dobot and province and province != 'ไม่ระบุ':
+                self.dobot_queue.put({
+                    'image_path': image_path,
+                    'province': province,
+                    'tracking': tracking,
+                    'result': result
+                })
+                log.info("   🤖 ส่งต่อไปยัง Dobot Queue")
+            else:
+                log.info("   ⚠️  ข้าม Dobot (ไม่ระบุจังหวัด หรือปิดใช้)")
         
-        print("🛑 หยุด OCR Worker Thread")
+        else:
+            log.warning("\n❌ OCR ล้มเหลว: %s", result.error)
+        
+        self.print_stats()
     
     def dobot_worker(self):
         """Worker Thread: ควบคุม Dobot"""
-        print("🔄 เริ่ม Dobot Worker Thread")
+        log.info("🔄 เริ่ม Dobot Worker Thread")
         
-        while self.is_running:
+        while True:
+            parcel_data = self.dobot_queue.get()  # บล็อกจนมีงาน (ไม่ต้อง poll)
+            if parcel_data is None:  # sentinel จาก shutdown()
+                self.dobot_queue.task_done()
+                break
+            
+            # รวมพัสดุที่รออยู่ถัดไปและไปจังหวัดเดียวกันเป็นชุดเดียว (กลับ Home ครั้งเดียวต่อชุด)
+            # มี consumer เดียวจึงดูหัวคิวก่อน get_nowait ได้อย่างปลอดภัย
+            province = parcel_data['province']
+            batch = [parcel_data]
+            while len(batch) < DOBOT_MAX_BATCH:
+                try:
+                    next_item = self.dobot_queue.queue[0]
+                except IndexError:
+                    break
+                if next_item is None or next_item['province'] != province:
+                    break
+                batch.append(self.dobot_queue.get_nowait())
+            
             try:
-                if not self.dobot_queue.empty():
-                    parcel_data = self.dobot_queue.get()
-                    
-                    province = parcel_data['province']
-                    tracking = parcel_data['tracking']
-                    
-                    print(f"\n{'='*60}")
-                    print(f"🤖 Dobot: คัดแยกพัสดุ {tracking} → {province}")
-                    print(f"{'='*60}")
-                    
-                    # สั่งงาน Dobot
-                    success = self.dobot_controller.pick_and_place(province)
-                    
+                trackings = ", ".join(str(item['tracking']) for item in batch)
+                log.info("\n%s\n🤖 Dobot: คัดแยกพัสดุ %s → %s\n%s", '='*60, trackings, province, '='*60)
+                
+                # สั่งงาน Dobot
+                results = self.dobot_controller.pick_and_place_batch(province, len(batch))
+                
+                for item, success in zip(batch, results):
                     if success:
-                        self.stats['dobot_sorted'] += 1
-                        print(f"✅ Dobot คัดแยกสำเร็จ")
+                        with self._stats_lock:
+                            self.stats['dobot_sorted'] += 1
+                        log.info("✅ Dobot คัดแยกสำเร็จ: %s", item['tracking'])
                         
-                        # ย้ายภาพไป processed
-                        self.move_to_processed(parcel_data['image_path'])
+                        # ย้ายภาพไป processed (ใน background - แขนกลไปทำงานต่อได้ทันที)
+                        self.move_pool.submit(self.move_to_processed, item['image_path'])
                     else:
-                        self.stats['dobot_failed'] += 1
-                        print(f"❌ Dobot คัดแยกล้มเหลว")
-                    
-                    # กลับ Home
-                    self.dobot_controller.move_home("รอพัสดุชิ้นต่อไป")
-                    
-                    self.dobot_queue.task_done()
-                    self.print_stats()
+                        with self._stats_lock:
+                            self.stats['dobot_failed'] += 1
+                        log.warning("❌ Dobot คัดแยกล้มเหลว: %s", item['tracking'])
+                
+                # กลับ Home
+                self.dobot_controller.move_home("รอพัสดุชิ้นต่อไป")
                 
-                else:
-                    time.sleep(0.5)
+                self.print_stats()
             
             except Exception as e:
-                print(f"❌ ข้อผิดพลาดใน Dobot Worker: {e}")
-                import traceback
-                traceback.print_exc()
-                time.sleep(1)
+                log.exception("❌ ข้อผิดพลาดใน Dobot Worker: %s", e)
+            
+            finally:
+                for _ in batch:
+                    self.dobot_queue.task_done()
         
-        print("🛑 หยุด Dobot Worker Thread")
+        log.info("🛑 หยุด Dobot Worker Thread")
     
-    def monitor_new_images(self):
-        """Monitor Thread: ตรวจจับภาพใหม่"""
-        print("👁️  เริ่ม Image Monitor Thread")
+    def _wait_file_stable(self, path: str, poll: float = 0.02, max_wait: float = 2.0) -> bool:
+        """รอจนขนาดไฟล์ไม่เปลี่ยน (เขียนเสร็จแล้ว) - คืน False ถ้าไฟล์หายไป"""
+        deadline = time.monotonic() + max_wait
+        last_size = -1
+        while True:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return False
+            if size > 0 and size == last_size:
+                return True
+            if time.monotonic() >= deadline:
+                return size > 0
+            last_size = size
+            time.sleep(poll)
+
+    def _enqueue_image(self, filepath: str):
+        """ส่งภาพใหม่เข้า OCR Queue (เรียกจาก watchdog หรือ polling)"""
+        if not is_image_file(filepath):
+            return
+        # ข้ามไฟล์ในโฟลเดอร์ย่อย เช่น ภาพที่ถูกย้ายเข้า processed/
+        abspath = os.path.abspath(filepath)
+        if os.path.dirname(abspath) != self._image_dir:
+            return
         
-        processed_files = set()
+        # ภาพจากกล้องที่เข้า OCR ผ่าน bytes ไปแล้ว - เช็คก่อน stat เพื่อให้ path ถูกเอาออกจาก _claimed ทุกครั้ง
+        # (แม้ไฟล์จะถูกย้ายไปแล้วหรือเคยเห็นแล้ว) _claimed จึงไม่โตขึ้นเรื่อย ๆ
+        with self._stats_lock:
+            claimed = abspath in self._claimed
+            self._claimed.discard(abspath)
         
-        while self.is_running:
+        # กัน event ซ้ำ (เช่น created + moved ของไฟล์เดียวกัน) ด้วย inode + mtime + ขนาด ซึ่งไม่เปลี่ยนเมื่อ rename
+        # รวม mtime/ขนาดด้วยเพราะ inode ของไฟล์ที่ถูกลบจะถูกนำกลับมาใช้กับไฟล์ใหม่ได้ทันที
+        # ใช้ os.stat เพราะ DirEntry.stat() บน Windows ไม่มี st_ino
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return
+        key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+        if key in self._seen:
+            return
+        self._seen[key] = None
+        if len(self._seen) > SEEN_FILES_MAX:
+            self._seen.popitem(last=False)
+        if claimed:
+            return  # จำ key ไว้แล้ว event ถัดไปของไฟล์นี้จึงถูกข้ามด้วย
+        
+        with self._stats_lock:
+            self.stats['images_captured'] += 1
+        self.submit_ocr(filepath)
+
+        log.info("\n📸 ตรวจพบภาพใหม่: %s\n   📋 OCR Queue: %d\n   🤖 Dobot Queue: %d",
+                 os.path.basename(filepath), self._ocr_pending, self.dobot_queue.qsize())
+
+    def start_image_monitor(self):
+        """เริ่มตรวจจับภาพใหม่: watchdog (ถ้ามี) หรือ Monitor Thread แบบวนตรวจโฟลเดอร์"""
+        if WATCHDOG_AVAILABLE:
+            # โหมด event: callback ทำงานใน thread ของ Observer เอง ไม่ต้องมี monitor thread แยก
+            self.observer = Observer()
+            self.observer.schedule(NewImageHandler(self._enqueue_image), self.image_folder, recursive=False)
+            self.observer.start()
+            log.info("👁️  เริ่ม Image Monitor (watchdog)")
+            return
+        
+        self.monitor_thread = threading.Thread(
+            target=self.monitor_new_images,
+            daemon=True
+        )
+        self.monitor_thread.start()
+    
+    def monitor_new_images(self):
+        """Monitor Thread (สำรองเมื่อไม่มี watchdog): วนตรวจโฟลเดอร์ทุก process_interval วินาที"""
+        log.info("👁️  เริ่ม Image Monitor Thread")
+
+        processed_files = set()
+
+        while not self._stop.is_set():
             try:
                 current_files = set()
-                
-                if os.path.exists(self.image_folder):
-                    for filename in os.listdir(self.image_folder):
-                        if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                            current_files.add(filename)
-                
+
+                # scandir ได้ชนิดไฟล์มาพร้อมกับชื่อ ไม่ต้อง stat ทีละไฟล์
+                with os.scandir(self.image_folder) as entries:
+                    for entry in entries:
+                        if is_image_file(entry.name) and entry.is_file(follow_symlinks=False):
+                            current_files.add(entry.name)
+
                 new_files = current_files - processed_files
-                
-                if new_files:
-                    for filename in sorted(new_files):
-                        filepath = os.path.join(self.image_folder, filename)
-                        
-                        if os.path.exists(filepath):
-                            time.sleep(0.5)  # รอให้ไฟล์เขียนเสร็จ
-                            
-                            self.ocr_queue.put(filepath)
-                            processed_files.add(filename)
-                            self.stats['images_captured'] += 1
-                            
-                            print(f"\n📸 ตรวจพบภาพใหม่: {filename}")
-                            print(f"   📋 OCR Queue: {self.ocr_queue.qsize()}")
-                            print(f"   🤖 Dobot Queue: {self.dobot_queue.qsize()}")
-                
-                time.sleep(self.process_interval)
-            
+                # จำเฉพาะชื่อที่ยังอยู่ในโฟลเดอร์ (ภาพที่ย้ายไป processed/ แล้วไม่ต้องจำ)
+                processed_files &= current_files
+
+                for filename in sorted(new_files):
+                    processed_files.add(filename)
+                    self._enqueue_image(os.path.join(self.image_folder, filename))
+
+                self._stop.wait(self.process_interval)
+
             except Exception as e:
-                print(f"❌ ข้อผิดพลาดใน Monitor Thread: {e}")
-                time.sleep(1)
-        
-        print("🛑 หยุด Image Monitor Thread")
+                log.error("❌ ข้อผิดพลาดใน Monitor Thread: %s", e)
+                self._stop.wait(1)
+
+        log.info("🛑 หยุด Image Monitor Thread")
     
     def move_to_processed(self, image_path: str):
         """ย้ายภาพที่ประมวลผลแล้วไปโฟลเดอร์ processed"""
         try:
-            processed_folder = os.path.join(self.image_folder, "processed")
-            if not os.path.exists(processed_folder):
-                os.makedirs(processed_folder)
-            
             filename = os.path.basename(image_path)
-            dest_path = os.path.join(processed_folder, filename)
-            
-            if os.path.exists(image_path):
-                os.rename(image_path, dest_path)
-                print(f"   📁 ย้ายภาพไป: processed/{filename}")
+            # os.replace ทับไฟล์ปลายทางได้ทุก OS (os.rename บน Windows จะ error ถ้ามีไฟล์ชื่อซ้ำ)
+            os.replace(image_path, os.path.join(self.processed_folder, filename))
+            log.info("   📁 ย้ายภาพไป: processed/%s", filename)
         
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            print(f"   ⚠️ ไม่สามารถย้ายภาพ: {e}")
+            log.warning("   ⚠️ ไม่สามารถย้ายภาพ: %s", e)
     
-    def print_stats(self):
-        """แสดงสถิติ"""
-        print(f"\n{'='*60}")
-        print(f"📊 สถิติการทำงาน")
-        print(f"{'='*60}")
-        print(f"📸 ภาพที่ถ่าย:       {self.stats['images_captured']}")
-        print(f"🔍 OCR ประมวลผล:     {self.stats['ocr_processed']}")
-        print(f"   ✅ สำเร็จ:         {self.stats['ocr_success']}")
-        print(f"   ❌ ล้มเหลว:       {self.stats['ocr_failed']}")
+    def print_stats(self, force: bool = False):
+        """แสดงสถิติ (ไม่เกินวินาทีละครั้ง ยกเว้น force=True)"""
+        if not log.isEnabledFor(logging.INFO):
+            return
+        now = time.monotonic()
+        if not force and now - self._last_stats_print < 1.0:
+            return
+        self._last_stats_print = now
         
-        if self.enable_dobot:
-            print(f"🤖 Dobot คัดแยก:     {self.stats['dobot_sorted']}")
-            print(f"   ❌ ล้มเหลว:       {self.stats['dobot_failed']}")
+        with self._stats_lock:
+            stats = dict(self.stats)
+            ocr_pending = self._ocr_pending
         
-        if self.save_to_db:
-            print(f"💾 Database:         {self.stats['db_saved']} (ล้มเหลว: {self.stats['db_failed']})")
+        stats['ocr_pending'] = ocr_pending
+        stats['dobot_pending'] = self.dobot_queue.qsize()
         
-        print(f"📋 รอประมวลผล:")
-        print(f"   OCR Queue:        {self.ocr_queue.qsize()}")
+        # format ครั้งเดียวจาก template ที่ประกอบไว้แล้ว และเป็น log record เดียว (ไม่ให้ thread อื่นแทรก)
+        if self._stats_template is None:
+            self._stats_template = self._build_stats_template()
+        log.info(self._stats_template.format_map(stats))
+    
+    def _build_stats_template(self) -> str:
+        """ประกอบ template ของตารางสถิติตามส่วนที่เปิดใช้ (Dobot / Database)"""
+        parts = [self._STATS_HEAD]
         if self.enable_dobot:
-            print(f"   Dobot Queue:      {self.dobot_queue.qsize()}")
-        print(f"{'='*60}")
+            parts.append(self._STATS_DOBOT)
+        if self.save_to_db:
+            parts.append(self._STATS_DB)
+        parts.append(self._STATS_PENDING)
+        if self.enable_dobot:
+            parts.append(self._STATS_DOBOT_PENDING)
+        parts.append("="*60)
+        return "".join(parts)
     
     def run(self):
         """เริ่มการทำงานของระบบทั้งหมด"""
@@ -380,16 +579,9 @@ class CompleteSortingPipeline:
         self.initialize_components()
         
         # เริ่ม threads
-        self.is_running = True
+        self._stop.clear()
         
         if self.auto_process:
-            # OCR Worker
-            self.ocr_thread = threading.Thread(
-                target=self.ocr_worker,
-                daemon=True
-            )
-            self.ocr_thread.start()
-            
             # Dobot Worker (ถ้าเปิดใช้)
             if self.enable_dobot:
                 self.dobot_thread = threading.Thread(
@@ -399,11 +591,7 @@ class CompleteSortingPipeline:
                 self.dobot_thread.start()
             
             # Image Monitor
-            self.monitor_thread = threading.Thread(
-                target=self.monitor_new_images,
-                daemon=True
-            )
-            self.monitor_thread.start()
+            self.start_image_monitor()
             
             print("\n✅ เริ่มระบบประมวลผลอัตโนมัติ")
         
@@ -418,51 +606,69 @@ class CompleteSortingPipeline:
     
     def shutdown(self):
         """ปิดระบบ"""
-        print("\n🛑 กำลังปิดระบบ...")
-        
-        self.is_running = False
-        
-        # รอ queue ว่าง
-        if not self.ocr_queue.empty():
-            print(f"⏳ รอ OCR ({self.ocr_queue.qsize()} ภาพ)...")
-            self.ocr_queue.join()
-        
-        if self.enable_dobot and not self.dobot_queue.empty():
-            print(f"⏳ รอ Dobot ({self.dobot_queue.qsize()} ชิ้น)...")
-            self.dobot_queue.join()
-        
-        # รอ threads
-        for thread in [self.ocr_thread, self.dobot_thread, self.monitor_thread]:
-            if thread and thread.is_alive():
-                thread.join(timeout=5)
+        log.info("\n🛑 กำลังปิดระบบ...")
+        
+        self._stop.set()  # ปลุกและหยุด Image Monitor ทันที
+        
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+        if self.monitor_thread and self.monitor_thread.is_alive():
+            self.monitor_thread.join(timeout=5)
+        
+        # รอ OCR ที่ค้างอยู่ใน pool ให้เสร็จ (callback ส่งงานเข้า Dobot Queue ก่อน pool ปิด)
+        if self.ocr_pool:
+            if self._ocr_pending:
+                log.info("⏳ รอ OCR (%d ภาพ)...", self._ocr_pending)
+            self.ocr_pool.shutdown(wait=True)
+        
+        # ส่ง sentinel (None) ต่อท้ายคิว: Dobot worker จะทำงานที่ค้างให้เสร็จก่อนแล้วจึงหยุด
+        # (ปิดหลัง OCR เพราะ OCR ยังส่งงานเข้า Dobot Queue ได้)
+        if self.dobot_thread and self.dobot_thread.is_alive():
+            if not self.dobot_queue.empty():
+                log.info("⏳ รอ Dobot (%d ชิ้น)...", self.dobot_queue.qsize())
+            self.dobot_queue.put(None)
+            self.dobot_thread.join()
+        
+        # รอย้ายภาพที่ค้างอยู่ให้เสร็จ
+        if self.move_pool:
+            self.move_pool.shutdown(wait=True)
         
         # ปิด Dobot
         if self.dobot_controller:
             self.dobot_controller.disconnect()
         
         # สรุปผล
-        print("\n" + "="*60)
-        print("📊 สรุปผลการทำงาน")
-        print("="*60)
-        self.print_stats()
+        log.info("\n%s\n📊 สรุปผลการทำงาน\n%s", "="*60, "="*60)
+        self.print_stats(force=True)
         
         # แสดงสถิติ OCR
         if self.ocr_processor:
-            print("\n" + self.ocr_processor.generate_sorting_report([]))
+            log.info("\n%s", self.ocr_processor.generate_sorting_report([]))
         
         # แสดงสถิติ Dobot
         if self.dobot_controller:
             self.dobot_controller.print_stats()
         
-        print("\n✅ ปิดระบบเรียบร้อย")
-        print(f"📁 ผลลัพธ์:")
-        print(f"   - ภาพ: {self.image_folder}/")
-        print(f"   - ผลลัพธ์: {self.output_folder}/")
+        log.info("\n✅ ปิดระบบเรียบร้อย\n📁 ผลลัพธ์:\n   - ภาพ: %s/\n   - ผลลัพธ์: %s/",
+                 self.image_folder, self.output_folder)
 
 
 def main():
     """ฟังก์ชันหลัก"""
     
+    # log ระดับ INFO เป็นค่าเริ่มต้น (ขั้นตอนการเคลื่อนที่ของ Dobot และรายละเอียด OCR เป็น DEBUG จึงไม่แสดง)
+    # ตั้ง LOG_LEVEL=DEBUG ใน .env เพื่อดูทั้งหมด
+    # thread ต่าง ๆ แค่ใส่ record ลงคิว ให้ QueueListener thread เดียวเป็นคนเขียนออก stdout
+    log_queue = SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(_env().get("LOG_LEVEL", "INFO").upper())
+    listener.start()
+    
     config = {
         # API Settings
         'typhoon_api_key': None,  # อ่านจาก .env
@@ -476,10 +682,12 @@ def main():
         # Camera Settings
         'camera_index': 1,
         'auto_capture': False,
+        'detect_every': 3,              # ตรวจจับพัสดุทุกๆ N เฟรม
         
         # OCR Settings
         'enhance_images': True,
         'save_to_db': True,  # เปลี่ยนเป็น True ถ้าต้องการบันทึก DB
+        'ocr_workers': 4,               # จำนวนภาพที่ส่ง OCR พร้อมกัน
         
         # Dobot Settings
         'enable_dobot': True,           # เปลี่ยนเป็น False ถ้าไม่มี Dobot
@@ -494,7 +702,10 @@ def main():
     
     # สร้างและรัน pipeline
     pipeline = CompleteSortingPipeline(config)
-    pipeline.run()
+    try:
+        pipeline.run()
+    finally:
+        listener.stop()  # เขียน log ที่ค้างในคิวให้หมดก่อนออก
 
 
 if __name__ == "__main__":
@@ -1,24 +1,240 @@
 #process.py
 import cv2
-from openai import OpenAI
+from openai import OpenAI, DefaultHttpxClient
+import httpx
 import json
+import logging
 import re
 from datetime import datetime
 from PIL import Image
+from io import BytesIO
 import base64
+import hashlib
+import itertools
 import os
-from typing import Dict, Optional, List
+import shutil
+from typing import Dict, Optional, List, Tuple
 import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
+from dataclasses import dataclass, fields
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter, OrderedDict
+
+log = logging.getLogger(__name__)
+
+# Aho-Corasick (ถ้ามี): ค้นชื่อจังหวัดทั้ง 77 ชื่อในข้อความด้วยการสแกนรอบเดียว
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Hyperscan (ถ้ามี - ต้องมี libhs ในระบบ): สแกนชื่อจังหวัดทั้งหมดด้วย SIMD เร็วกว่า Aho-Corasick อีกขั้น
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# orjson (ถ้ามี): เขียนไฟล์ JSON ผลลัพธ์เร็วกว่า json มาตรฐาน
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# --- Regex ที่ใช้ทุกพัสดุ (compile ครั้งเดียวตอน import) ---
+THAI_WORD_RE = re.compile(r'[\u0E00-\u0E7F]+')
+PROVINCE_MARKER_RES = (
+    re.compile(r'จ\.([^\s\d]+)'),
+    re.compile(r'จังหวัด([^\s\d]+)'),
+)
+PROVINCE_PREFIX_RE = re.compile(r'(?:จ\.|จังหวัด)\s*([^\s\d,]+)')
+
+# marker แต่ละฝั่งรวมเป็น alternation เดียว: search ครั้งเดียวได้ตำแหน่งที่มาก่อนสุดของทุกคำ
+SENDER_MARKER_RE = re.compile(r'(?:ผู้ส่ง|sender|from)\s*[:：]?', re.IGNORECASE)
+RECIPIENT_MARKER_RE = re.compile(r'(?:ผู้รับ|recipient|to)\s*[:：]?', re.IGNORECASE)
+RECIPIENT_MARKER_PATTERNS = (
+    r'ผู้รับ\s*[:：]?',
+    r'recipient\s*[:：]?',
+    r'to\s*[:：]?',
+)
+RECIPIENT_MARKERS_TO_END = tuple(re.compile(p + r'.*$', re.IGNORECASE) for p in RECIPIENT_MARKER_PATTERNS)
+PHONE_LABEL_RE = re.compile(r'(?:โทร|tel|phone)\s*[:：]?\s*[0-9\s\-]{9,}', re.IGNORECASE)
+
+JSON_FENCE_OPEN_JSON_RE = re.compile(r'^```json\s*')
+JSON_FENCE_OPEN_RE = re.compile(r'^```\s*')
+JSON_FENCE_CLOSE_RE = re.compile(r'\s*```')
+JSON_DECODER = json.JSONDecoder()
+
+NAME_PATTERNS = tuple(re.compile(p, re.IGNORECASE | re.MULTILINE) for p in (
+    r'(?:ชื่อ|name)[:\s]*([^\n\r]+?)(?=\n|ที่อยู่|address|โทร|tel|$)',
+    r'^([^\n\r]+?)(?=\n)',  # first line
+))
+NAME_LABEL_RE = re.compile(r'(?:ชื่อ|name)[:\s]*', re.IGNORECASE)
+PHONE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(?:โทร|tel|phone)[:\s]*([0-9\s\-]{9,})',
+    r'\b(0\d{2}[\s\-]?\d{3}[\s\-]?\d{4})\b',
+    r'\b(\d{3}[\s\-]?\d{3}[\s\-]?\d{4})\b',
+))
+NON_DIGIT_RE = re.compile(r'[^\d]')
+ADDRESS_PATTERNS = tuple(re.compile(p, re.IGNORECASE | re.DOTALL) for p in (
+    r'(?:ที่อยู่|address)[:\s]*([^\n\r]+?)(?=\n(?:โทร|tel)|$)',
+    r'(?:จ\.|จังหวัด)[\s]*([^\n\r]+)',
+))
+ADDRESS_LABEL_RE = re.compile(r'(?:ที่อยู่|address)[:\s]*', re.IGNORECASE)
+PERSON_LOG_PREFIX = ("   📤", "   📥")  # index ด้วย is_recipient
+TRACKING_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'tracking[_\s]*(?:number)?[:\s]*([A-Z0-9]+)',
+    r'เลข(?:พัสดุ|ติดตาม)?[:\s]*([A-Z0-9]+)',
+    r'\b([A-Z]{2,}\d{8,})\b',
+))
+
+
+def _dump_json(obj, filepath: str):
+    """เขียน JSON ลงไฟล์ (UTF-8, indent 2) ด้วย orjson ถ้ามี ไม่งั้นใช้ json มาตรฐาน"""
+    if ORJSON_AVAILABLE:
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+
+
+def _dump_json_items(head: Dict, key: str, items, filepath: str):
+    """
+    เขียน JSON แบบเดียวกับ _dump_json({**head, key: [...]}) แต่ทยอยเขียน items ทีละรายการ
+    (ไม่ต้องสร้าง list/dict ก้อนใหญ่ของทั้ง batch ในหน่วยความจำ)
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(head, option=option)[:-2])  # ตัด "\n}" ท้าย object ออก
+            f.write(b',\n  ' + orjson.dumps(key) + b': [')
+            sep = b'\n    '
+            for item in items:
+                f.write(sep + orjson.dumps(item, option=option).replace(b'\n', b'\n    '))
+                sep = b',\n    '
+            f.write(b'\n  ]\n}' if sep != b'\n    ' else b']\n}')
+    else:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(head, ensure_ascii=False, indent=2)[:-2])
+            f.write(',\n  ' + json.dumps(key, ensure_ascii=False) + ': [')
+            sep = '\n    '
+            for item in items:
+                f.write(sep + json.dumps(item, ensure_ascii=False, indent=2).replace('\n', '\n    '))
+                sep = ',\n    '
+            f.write('\n  ]\n}' if sep != '\n    ' else ']\n}')
+
+
+def _find_json_object(text: str) -> Optional[Dict]:
+    """หา JSON object ตัวแรกในข้อความ: ลอง raw_decode ทีละตำแหน่ง '{' (เส้นตรง และรองรับซ้อนกี่ชั้นก็ได้)"""
+    i = text.find('{')
+    while i != -1:
+        try:
+            obj, _ = JSON_DECODER.raw_decode(text, i)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError:
+            pass
+        i = text.find('{', i + 1)
+    return None
+
+
+# ชื่อย่อ / ชื่อที่นิยมเขียนบนฉลาก -> ชื่อจังหวัดเต็ม (ใส่ใน automaton เดียวกับชื่อจังหวัด)
+PROVINCE_ALIASES = {
+    "กทม": "กรุงเทพมหานคร",
+    "กรุงเทพ": "กรุงเทพมหานคร",
+    "กรุงเทพฯ": "กรุงเทพมหานคร",
+    "อยุธยา": "พระนครศรีอยุธยา",
+    "โคราช": "นครราชสีมา",
+}
+
+
+# คอลัมน์ของ CompleteParcelSortingSystem.parcels
+PARCEL_COLUMNS = (
+    "image_file", "tracking_number", "province", "region",
+    "sender_name", "sender_phone", "sender_province",
+    "recipient_name", "recipient_phone", "recipient_province",
+)
+
+# แถบกราฟในรายงาน (สร้างไว้ครั้งเดียว ใช้ index ตามความยาว) - 1 ช่องต่อ 2% สูงสุด 100%
+REPORT_BARS = tuple("█" * i for i in range(51))
+
+DB_BULK_SIZE = 50  # จำนวนพัสดุต่อ 1 request ตอนบันทึก Database แบบ batch
+
+IMAGE_EXTS = frozenset({'.jpg', '.jpeg', '.png', '.bmp'})
+
+
+@dataclass(slots=True)
+class ParcelResult:
+    """ผลการประมวลผลพัสดุ 1 ชิ้น (slots: ใช้หน่วยความจำน้อยกว่า dict มากเมื่อเก็บหลายหมื่นรายการ)"""
+    image_file: str
+    image_path: str
+    timestamp: str
+    success: bool = False
+    tracking_number: Optional[str] = None
+    province: Optional[str] = None
+    region: Optional[str] = None
+    delivery_route: Optional[str] = None
+    data: Optional[Dict] = None
+    raw_ocr: Optional[str] = None
+    error: Optional[str] = None
+    db_saved: bool = False
+    db_parcel_id: Optional[int] = None
+    db_sender_id: Optional[int] = None
+    db_recipient_id: Optional[int] = None
+    db_error: Optional[str] = None
+    
+    def to_dict(self) -> Dict:
+        """แปลงเป็น dict สำหรับเขียน JSON (shallow - ไม่ deepcopy data แบบ dataclasses.asdict)"""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+def is_image_file(name: str) -> bool:
+    """ตรวจนามสกุลไฟล์ภาพ (lower() เฉพาะนามสกุล และเฉพาะเมื่อมีตัวพิมพ์ใหญ่)"""
+    dot = name.rfind('.')
+    if dot < 0:
+        return False
+    ext = name[dot:]
+    if not ext.islower():
+        ext = ext.lower()
+    return ext in IMAGE_EXTS
 
 
 class DatabaseAPI:
     """Class สำหรับเชื่อมต่อกับ PHP API และบันทึกข้อมูลลง MySQL"""
     
+    TRACKING_CACHE_SIZE = 1024  # จำนวนผล get_parcel_by_tracking ที่เก็บไว้
+    TRACKING_CACHE_TTL = 60.0   # วินาที
+    
     def __init__(self, api_url: str, api_key: str):
         self.api_url = api_url
         self.api_key = api_key
+        # cache ผลค้นหาตาม tracking number (LRU + หมดอายุตาม TTL) ไม่ต้องยิง API ซ้ำ
+        self._tracking_cache = OrderedDict()
+        self._tracking_lock = threading.Lock()
         self.session = requests.Session()
+        # connection pool ใช้ร่วมกันทุก OCR thread + retry เฉพาะกรณีที่ PHP ยังไม่ได้บันทึกข้อมูลแน่ ๆ
+        # (create_parcel ไม่ idempotent: read timeout / 504 อาจ INSERT ไปแล้ว ถ้า retry จะได้ข้อมูลซ้ำ)
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=3,
+                read=0,  # ส่ง request ไปแล้วแต่รอคำตอบไม่ทัน - ไม่ retry
+                backoff_factor=0.3,
+                status_forcelist=(502, 503),
+                allowed_methods=frozenset(['POST'])  # API นี้ใช้ POST ทุก action
+            )
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
             'Authorization': f'Bearer {api_key}',  # ใช้ Authorization แทน
             'Content-Type': 'application/json'
@@ -38,11 +254,11 @@ class DatabaseAPI:
             # เตรียมข้อมูลให้ตรงกับ structure ที่ PHP API ต้องการ
             payload = self._prepare_payload(parcel_data)
             
-            print(f"📤 กำลังส่งข้อมูลไปยัง: {self.api_url}")
-            print(f"📦 Payload Preview:")
-            print(f"   - Sender: {payload['sender']['name']} ({payload['sender']['province']})")
-            print(f"   - Recipient: {payload['recipient']['name']} ({payload['recipient']['province']})")
-            print(f"   - Tracking: {payload['parcel']['tracking_number']}")
+            log.debug("📤 กำลังส่งข้อมูลไปยัง: %s", self.api_url)
+            log.debug("📦 Payload Preview:")
+            log.debug("   - Sender: %s (%s)", payload['sender']['name'], payload['sender']['province'])
+            log.debug("   - Recipient: %s (%s)", payload['recipient']['name'], payload['recipient']['province'])
+            log.debug("   - Tracking: %s", payload['parcel']['tracking_number'])
             
             response = self.session.post(
                 self.api_url,
@@ -54,25 +270,64 @@ class DatabaseAPI:
             result = response.json()
             
             if result.get('success'):
-                print(f"✅ บันทึกข้อมูลสำเร็จ - Parcel ID: {result.get('parcel_id')}")
+                log.debug("✅ บันทึกข้อมูลสำเร็จ - Parcel ID: %s", result.get('parcel_id'))
             else:
-                print(f"❌ บันทึกไม่สำเร็จ: {result.get('message')}")
+                log.error("❌ บันทึกไม่สำเร็จ: %s", result.get('message'))
             
             return result
             
         except requests.exceptions.RequestException as e:
-            print(f"❌ เกิดข้อผิดพลาดในการเชื่อมต่อ API: {e}")
+            log.error("❌ เกิดข้อผิดพลาดในการเชื่อมต่อ API: %s", e)
             return {
                 "success": False,
                 "message": str(e)
             }
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาด: {e}")
+            log.error("❌ เกิดข้อผิดพลาด: %s", e)
             return {
                 "success": False,
                 "message": str(e)
             }
     
+    def save_parcels_bulk(self, parcels: List[Dict]) -> List[Dict]:
+        """
+        บันทึกพัสดุหลายรายการใน request เดียว (action create_parcels_bulk)
+        
+        Returns:
+            response ของแต่ละรายการ ตามลำดับเดียวกับ parcels
+        """
+        if not parcels:
+            return []
+        try:
+            payload = {
+                "action": "create_parcels_bulk",
+                "parcels": [self._prepare_payload(p) for p in parcels]
+            }
+            
+            log.debug("📤 กำลังส่งข้อมูล %s รายการไปยัง: %s", len(parcels), self.api_url)
+            
+            response = self.session.post(
+                self.api_url,
+                json=payload,
+                timeout=30
+            )
+            
+            response.raise_for_status()
+            result = response.json()
+            
+            results = result.get('results') or []
+            if not result.get('success') or len(results) != len(parcels):
+                message = result.get('message') or 'ผลลัพธ์จาก API ไม่ครบ'
+                log.error("❌ บันทึกไม่สำเร็จ: %s", message)
+                return [{"success": False, "message": message}] * len(parcels)
+            
+            log.info("✅ บันทึกข้อมูลสำเร็จ %s/%s รายการ", sum(1 for r in results if r.get('success')), len(parcels))
+            return results
+            
+        except Exception as e:
+            log.error("❌ เกิดข้อผิดพลาดในการเชื่อมต่อ API: %s", e)
+            return [{"success": False, "message": str(e)}] * len(parcels)
+    
     def _prepare_payload(self, parcel_data: Dict) -> Dict:
         """
         แปลงข้อมูลจาก OCR เป็น format ที่ database ต้องการ
@@ -103,7 +358,27 @@ class DatabaseAPI:
         return payload
     
     def get_parcel_by_tracking(self, tracking_number: str) -> Optional[Dict]:
-        """ดึงข้อมูลพัสดุจาก tracking number"""
+        """ดึงข้อมูลพัสดุจาก tracking number (ใช้ผลใน cache ถ้ายังไม่หมดอายุ)"""
+        key = tracking_number.strip().upper()
+        now = time.monotonic()
+        with self._tracking_lock:
+            entry = self._tracking_cache.get(key)
+            if entry is not None:
+                if now - entry[0] < self.TRACKING_CACHE_TTL:
+                    self._tracking_cache.move_to_end(key)
+                    return entry[1]
+                del self._tracking_cache[key]
+        
+        result = self._fetch_parcel_by_tracking(tracking_number)
+        if result is not None and result.get('success'):
+            with self._tracking_lock:
+                self._tracking_cache[key] = (now, result)
+                self._tracking_cache.move_to_end(key)
+                if len(self._tracking_cache) > self.TRACKING_CACHE_SIZE:
+                    self._tracking_cache.popitem(last=False)
+        return result
+    
+    def _fetch_parcel_by_tracking(self, tracking_number: str) -> Optional[Dict]:
         try:
             payload = {
                 "action": "get_parcel",
@@ -120,11 +395,14 @@ class DatabaseAPI:
             return response.json()
             
         except Exception as e:
-            print(f"❌ ไม่สามารถดึงข้อมูล: {e}")
+            log.error("❌ ไม่สามารถดึงข้อมูล: %s", e)
             return None
     
     def update_parcel_status(self, parcel_id: int, status: str) -> Dict:
         """อัพเดทสถานะพัสดุ"""
+        # สถานะเปลี่ยน - ผลที่ cache ไว้ใช้ไม่ได้แล้ว (cache อ้างด้วย tracking ไม่ใช่ parcel_id จึงล้างทั้งหมด)
+        with self._tracking_lock:
+            self._tracking_cache.clear()
         try:
             payload = {
                 "action": "update_status",
@@ -142,7 +420,7 @@ class DatabaseAPI:
             return response.json()
             
         except Exception as e:
-            print(f"❌ ไม่สามารถอัพเดทสถานะ: {e}")
+            log.error("❌ ไม่สามารถอัพเดทสถานะ: %s", e)
             return {
                 "success": False,
                 "message": str(e)
@@ -152,24 +430,176 @@ class DatabaseAPI:
 class TyphoonOCR:
     """Class สำหรับเชื่อมต่อกับ Typhoon OCR API"""
     
-    def __init__(self, api_key: str):
+    MEM_CACHE_SIZE = 200  # จำนวนผล OCR ล่าสุดที่เก็บในหน่วยความจำ
+    MAX_UPLOAD_SIDE = 1600  # ด้านยาวสูงสุด (px) ของภาพที่ส่งขึ้น API
+    MAX_UPLOAD_BYTES = 2_000_000  # ไฟล์ใหญ่กว่านี้ encode เป็น JPEG ใหม่เสมอ (เช่น PNG ความละเอียดไม่สูงแต่ไฟล์ใหญ่)
+    UPLOAD_JPEG_QUALITY = 85
+    
+    # prompt คงที่ทุกครั้ง (ข้อความเหมือนเดิมทุก request - ใช้ prompt cache ฝั่ง provider ได้)
+    SYSTEM_MSG = "You are an OCR expert. Extract data from parcel labels and return ONLY valid JSON format. No other text."
+    OCR_PROMPT = """Read this parcel label and extract:
+- Sender (name, phone, address, province)
+- Recipient (name, phone, address, province)
+- Tracking number (if any)
+
+Return ONLY this JSON structure (no markdown, no explanation):
+{
+    "sender": {
+        "name": "sender name",
+        "phone": "phone number",
+        "address": "full address",
+        "province": "province name"
+    },
+    "recipient": {
+        "name": "recipient name",
+        "phone": "phone number",
+        "address": "full address",
+        "province": "province name"
+    },
+    "tracking_number": "tracking number or empty string"
+}"""
+    
+    def __init__(self, api_key: str, pool_size: int = 4, cache_dir: Optional[str] = ".ocr_cache"):
+        # client เดียวใช้ร่วมกันทุก OCR thread: connection pool + keep-alive ไม่ต้อง TLS handshake ทุกภาพ
         self.client = OpenAI(
             api_key=api_key,
-            base_url="https://api.opentyphoon.ai/v1"
+            base_url="https://api.opentyphoon.ai/v1",
+            max_retries=3,
+            http_client=DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            )
         )
         
-    def extract_text_from_image(self, image_path: str) -> str:
-        """อ่านข้อความจากรูปภาพด้วย Typhoon Vision"""
+        # cache ผล OCR ตาม MD5 ของไฟล์ภาพ: ภาพเดิม (พิมพ์ฉลากซ้ำ / ภาพทดสอบ) ไม่ต้องเรียก API ใหม่
+        # เก็บทั้งในหน่วยความจำ (LRU) และบนดิสก์ (ใช้ข้ามการรันได้) - cache_dir=None ปิด cache บนดิสก์
+        self._cache_dir = cache_dir
+        self._mem_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """หาผล OCR จาก cache (หน่วยความจำก่อน แล้วจึงดิสก์)"""
+        with self._cache_lock:
+            text = self._mem_cache.get(key)
+            if text is not None:
+                self._mem_cache.move_to_end(key)
+                return text
+        
+        if not self._cache_dir:
+            return None
         try:
-            with open(image_path, "rb") as image_file:
-                image_data = base64.b64encode(image_file.read()).decode('utf-8')
+            with open(os.path.join(self._cache_dir, f"{key}.json"), "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        self._mem_put(key, text)
+        return text
+    
+    def _mem_put(self, key: str, text: str):
+        with self._cache_lock:
+            self._mem_cache[key] = text
+            self._mem_cache.move_to_end(key)
+            if len(self._mem_cache) > self.MEM_CACHE_SIZE:
+                self._mem_cache.popitem(last=False)
+    
+    def _cache_put(self, key: str, text: str):
+        """เก็บผล OCR ลง cache (เขียนไฟล์ชั่วคราวแล้ว replace กันไฟล์ครึ่ง ๆ)"""
+        self._mem_put(key, text)
+        if not self._cache_dir:
+            return
+        path = os.path.join(self._cache_dir, f"{key}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning("⚠️ บันทึก OCR cache ไม่สำเร็จ: %s", e)
+    
+    def _prepare_upload(self, image_bytes: bytes) -> bytes:
+        """
+        ย่อภาพที่ใหญ่เกิน MAX_UPLOAD_SIDE และ encode ไฟล์ที่ใหญ่เกิน MAX_UPLOAD_BYTES เป็น JPEG ใหม่
+        (จำกัดขนาด upload = จำกัดเวลาที่ API ใช้ประมวลผลภาพ)
+        """
+        # อ่านขนาดจาก header ก่อน (PIL เปิดภาพแบบ lazy ยังไม่ decode) - ภาพส่วนใหญ่ผ่านได้โดยไม่ต้อง decode เลย
+        try:
+            with Image.open(BytesIO(image_bytes)) as header:
+                w, h = header.size
+        except Exception:
+            return image_bytes
+        scale = self.MAX_UPLOAD_SIDE / max(w, h, 1)
+        if scale >= 1.0 and len(image_bytes) <= self.MAX_UPLOAD_BYTES:
+            return image_bytes
+        
+        # decode เป็น BGR 8-bit เสมอ (ภาพ 4 channel / 16-bit จะ encode เป็น JPEG ไม่ได้)
+        img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return image_bytes
+        h, w = img.shape[:2]  # อาจสลับกับขนาดใน header ถ้าภาพมี EXIF orientation
+        if scale < 1.0:
+            img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, self.UPLOAD_JPEG_QUALITY])
+        if not ok:
+            return image_bytes
+        log.debug("🗜️  ลดขนาดภาพก่อนส่ง OCR: %d KB -> %d KB", len(image_bytes) // 1024, buf.nbytes // 1024)
+        return buf.tobytes()
+
+    @staticmethod
+    def _read_stream(response) -> str:
+        """
+        อ่านผล OCR แบบ streaming: คืนผลทันทีที่ได้ JSON object ครบตัวแรก ไม่ต้องรอ token ท้าย ๆ
+        ถ้าไม่ได้ JSON ครบจนจบ stream จะคืนข้อความดิบทั้งหมดให้ parse_ocr_result จัดการต่อ
+        """
+        parts = []
+        try:
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                if '}' not in delta:
+                    continue
+                
+                # ลองเฉพาะ '{' ตัวแรก - ถ้าลองตัวถัดไปจะได้ object ชั้นในที่ปิดก่อน object นอก
+                buf = ''.join(parts)
+                start = buf.find('{')
+                if start == -1:
+                    continue
+                try:
+                    data, _ = JSON_DECODER.raw_decode(buf, start)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(data, dict):
+                    return json.dumps(data, ensure_ascii=False)
+        finally:
+            response.close()
+        return ''.join(parts)
+
+    def extract_text_from_image(self, image_path: str, image_bytes: Optional[bytes] = None) -> str:
+        """อ่านข้อความจากรูปภาพด้วย Typhoon Vision (ส่ง image_bytes มาได้ถ้ามีภาพในหน่วยความจำแล้ว)"""
+        try:
+            if image_bytes is None:
+                with open(image_path, "rb") as image_file:
+                    image_bytes = image_file.read()
+            
+            cache_key = hashlib.md5(image_bytes).hexdigest()
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                log.debug("♻️  ใช้ผล OCR จาก cache")
+                return cached
+            
+            # key ของ cache คิดจากไฟล์ต้นฉบับ ส่วนภาพที่ส่งขึ้น API ย่อขนาดก่อน
+            image_data = base64.b64encode(self._prepare_upload(image_bytes)).decode('ascii')  # base64 เป็น ASCII ล้วน
             
             response = self.client.chat.completions.create(
                 model="typhoon-ocr-preview",
                 messages=[
                     {
                         "role": "system",
-                        "content": "You are an OCR expert. Extract data from parcel labels and return ONLY valid JSON format. No other text."
+                        "content": self.SYSTEM_MSG
                     },
                     {
                         "role": "user",
@@ -182,89 +612,110 @@ class TyphoonOCR:
                             },
                             {
                                 "type": "text",
-                                "text": """Read this parcel label and extract:
-- Sender (name, phone, address, province)
-- Recipient (name, phone, address, province)
-- Tracking number (if any)
-
-Return ONLY this JSON structure (no markdown, no explanation):
-{
-    "sender": {
-        "name": "sender name",
-        "phone": "phone number",
-        "address": "full address",
-        "province": "province name"
-    },
-    "recipient": {
-        "name": "recipient name",
-        "phone": "phone number",
-        "address": "full address",
-        "province": "province name"
-    },
-    "tracking_number": "tracking number or empty string"
-}"""
+                                "text": self.OCR_PROMPT
                             }
                         ]
                     }
                 ],
                 max_tokens=1000,
-                temperature=0.0
+                temperature=0.0,
+                stream=True
             )
             
-            return response.choices[0].message.content
+            text = self._read_stream(response)
+            if text:
+                self._cache_put(cache_key, text)
+            return text
             
         except Exception as e:
-            print(f"❌ Error calling Typhoon API: {e}")
+            log.error("❌ Error calling Typhoon API: %s", e)
             return ""
 
 
+def _enhance_to_bytes(image_path: str, image_bytes: Optional[bytes] = None,
+                      output_folder: Optional[str] = None) -> Optional[bytes]:
+    """
+    ปรับปรุงคุณภาพภาพแล้วคืนเป็น JPEG bytes ในหน่วยความจำ (ส่งเข้า OCR ได้เลยไม่ต้องผ่านดิสก์)
+    ฟังก์ชันระดับ module เพื่อให้ส่งเข้า process อื่นได้ - คืน None ถ้าปรับปรุงไม่สำเร็จ
+    """
+    try:
+        # แปลงเป็น grayscale ตั้งแต่ตอน decode (CLAHE รับเฉพาะภาพ 1 channel และข้อมูลลดลง 3 เท่า)
+        if image_bytes is not None:
+            img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        else:
+            img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            log.error("❌ ไม่สามารถอ่านภาพ: %s", image_path)
+            return None
+        
+        # ปรับความคมชัด
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        enhanced = clahe.apply(img)
+        
+        # ลด noise (medianBlur 3x3 เร็วกว่า fastNlMeansDenoising หลายสิบเท่า และพอสำหรับ OCR)
+        denoised = cv2.medianBlur(enhanced, 3)
+        
+        # ปรับ threshold
+        _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        
+        ok, buf = cv2.imencode('.jpg', binary, [cv2.IMWRITE_JPEG_QUALITY, 85])  # ไฟล์เล็กลง = base64 ที่ส่ง API สั้นลง
+        if not ok:
+            log.error("❌ encode ภาพที่ปรับปรุงแล้วไม่สำเร็จ: %s", image_path)
+            return None
+        data = buf.tobytes()
+        
+        # เก็บภาพที่ปรับปรุงแล้วไว้ดูด้วย (เฉพาะเมื่อกำหนด output_folder)
+        if output_folder:
+            output_path = os.path.join(output_folder, f"enhanced_{os.path.basename(image_path)}")
+            with open(output_path, 'wb') as f:
+                f.write(data)
+        
+        return data
+        
+    except Exception as e:
+        log.error("❌ Error enhancing image: %s", e)
+        return None
+
+
+def _enhance_worker(args: Tuple[str, Optional[str]]) -> Optional[bytes]:
+    """worker สำหรับ multiprocessing.Pool - รับ (image_path, output_folder)"""
+    image_path, output_folder = args
+    return _enhance_to_bytes(image_path, output_folder=output_folder)
+
+
 class ImagePreprocessor:
     """Class สำหรับปรับปรุงคุณภาพภาพก่อนทำ OCR"""
     
-    def __init__(self, output_folder: str = "enhanced_images"):
+    def __init__(self, output_folder: Optional[str] = None):
+        # output_folder=None: ไม่เขียนภาพที่ปรับปรุงแล้วลงดิสก์ (ส่งเป็น bytes ให้ OCR โดยตรง)
         self.output_folder = output_folder
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
+        if output_folder:
+            os.makedirs(output_folder, exist_ok=True)
     
-    def enhance_image(self, image_path: str) -> str:
-        """ปรับปรุงคุณภาพภาพ"""
-        try:
-            img = cv2.imread(image_path)
-            if img is None:
-                print(f"❌ ไม่สามารถอ่านภาพ: {image_path}")
-                return image_path
-            
-            # แปลงเป็น grayscale
+    def enhance_image(self, image_path: str, image_bytes: Optional[bytes] = None) -> Optional[bytes]:
+        """ปรับปรุงคุณภาพภาพ คืน JPEG bytes (decode จาก image_bytes ถ้ามี ไม่ต้องอ่านไฟล์)"""
+        return _enhance_to_bytes(image_path, image_bytes, self.output_folder)
     
-            
-            # ปรับความคมชัด
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            enhanced = clahe.apply(img)
-            
-            # ลด noise
-            denoised = cv2.fastNlMeansDenoising(enhanced)
-            
-            # ปรับ threshold
-            _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # บันทึกภาพที่ปรับปรุงแล้ว
-            filename = os.path.basename(image_path)
-            output_path = os.path.join(self.output_folder, f"enhanced_{filename}")
-            cv2.imwrite(output_path, binary)
-            
-            return output_path
-            
-        except Exception as e:
-            print(f"❌ Error enhancing image: {e}")
-            return image_path
+    def enhance_batch(self, paths: List[str]) -> List[Optional[bytes]]:
+        """
+        ปรับปรุงภาพหลายภาพพร้อมกันด้วย multiprocessing.Pool (งาน CPU ล้วน)
+        คืน JPEG bytes ของภาพที่ปรับปรุงแล้วตามลำดับเดียวกับ paths (None = ไม่สำเร็จ)
+        """
+        if len(paths) < 2:
+            return [self.enhance_image(path) for path in paths]
+        processes = min(os.cpu_count() or 1, len(paths))
+        with multiprocessing.Pool(processes=processes) as pool:
+            return list(pool.imap(_enhance_worker,
+                                  [(path, self.output_folder) for path in paths],
+                                  chunksize=4))
 
 
 class CompleteParcelSortingSystem:
     """ระบบคัดแยกพัสดุแบบครบวงจร (รองรับ Database)"""
     
     def __init__(self, typhoon_api_key: str, output_folder: str = "parcel_results",
-                 db_api_url: str = None, db_api_key: str = None):
-        self.ocr = TyphoonOCR(typhoon_api_key)
+                 db_api_url: str = None, db_api_key: str = None, ocr_pool_size: int = 4):
+        self.ocr = TyphoonOCR(typhoon_api_key, pool_size=ocr_pool_size)
         self.preprocessor = ImagePreprocessor()
         self.output_folder = output_folder
         self.sorted_folder = os.path.join(output_folder, "sorted_by_province")
@@ -273,15 +724,13 @@ class CompleteParcelSortingSystem:
         self.db_api = None
         if db_api_url and db_api_key:
             self.db_api = DatabaseAPI(db_api_url, db_api_key)
-            print("✅ เชื่อมต่อ Database API สำเร็จ")
+            log.info("✅ เชื่อมต่อ Database API สำเร็จ")
         else:
-            print("⚠️  ไม่ได้เชื่อมต่อ Database API (จะบันทึกเฉพาะ JSON)")
-        
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
+            log.warning("⚠️  ไม่ได้เชื่อมต่อ Database API (จะบันทึกเฉพาะ JSON)")
         
-        if not os.path.exists(self.sorted_folder):
-            os.makedirs(self.sorted_folder)
+        # sorted_folder อยู่ใต้ output_folder จึงสร้างทั้งสองชั้นในครั้งเดียว
+        os.makedirs(self.sorted_folder, exist_ok=True)
+        self._province_folders = set()  # โฟลเดอร์จังหวัดที่สร้างแล้ว (ไม่ต้อง makedirs ซ้ำทุกพัสดุ)
         
         # รายชื่อจังหวัดทั้งหมด
         self.all_provinces = [
@@ -327,26 +776,151 @@ class CompleteParcelSortingSystem:
                       "ระนอง", "ชุมพร", "สตูล"]
         }
         
-        # สถิติการประมวลผล
+        # ตารางค้นหาจังหวัด (สร้างครั้งเดียว ไม่ต้องคำนวณซ้ำทุกพัสดุ)
+        self._province_set = frozenset(self.all_provinces)
+        self._province_nospace = [(p.replace(" ", ""), p) for p in self.all_provinces]
+        self._province_nospace += [(alias, p) for alias, p in PROVINCE_ALIASES.items()]
+        # fuzzy: matrix จังหวัด x คำ (1 = จังหวัดนั้นมีคำนี้) ใช้ matvec ครั้งเดียวแทนวนทีละจังหวัด
+        province_words = [frozenset(THAI_WORD_RE.findall(p)) for p in self.all_provinces]
+        self._word_to_id = {w: i for i, w in enumerate(sorted(set().union(*province_words)))}
+        self._province_word_mat = np.zeros((len(self.all_provinces), len(self._word_to_id)), dtype=np.float32)
+        for row, words in enumerate(province_words):
+            self._province_word_mat[row, [self._word_to_id[w] for w in words]] = 1.0
+        self._province_to_region = {prov: region
+                                    for region, provs in self.region_mapping.items()
+                                    for prov in provs}
+        self._province_ac = None
+        if AHOCORASICK_AVAILABLE:
+            automaton = ahocorasick.Automaton()
+            for province_no_space, province in self._province_nospace:
+                automaton.add_word(province_no_space, province)
+            automaton.make_automaton()
+            self._province_ac = automaton
+        self._province_hs = None
+        if HYPERSCAN_AVAILABLE:
+            try:
+                database = hyperscan.Database()
+                database.compile(
+                    expressions=[re.escape(name).encode('utf-8') for name, _ in self._province_nospace],
+                    ids=list(range(len(self._province_nospace))),
+                    flags=[hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(self._province_nospace)
+                )
+                self._province_hs = database
+                self._hs_local = threading.local()  # scratch ใช้พร้อมกันหลาย thread ไม่ได้ - แยกต่อ thread
+            except Exception as e:
+                log.warning("⚠️ compile Hyperscan ไม่สำเร็จ ใช้วิธีค้นหาปกติแทน: %s", e)
+        
+        # สถิติการประมวลผล (ป้องกันด้วย lock เพราะ process_single_parcel ถูกเรียกจากหลาย thread)
+        self._stats_lock = threading.Lock()
+        
+        # tracking number สำรอง (เมื่อ OCR อ่านไม่ได้): prefix เวลาเริ่มระบบ + ลำดับที่
+        # format เวลาครั้งเดียว และไม่ชนกันแม้หลาย thread สร้างในวินาทีเดียวกัน
+        self._tracking_prefix = f"PKG{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        self._tracking_seq = itertools.count(1)
         self.stats = {
             "total_processed": 0,
             "successful": 0,
             "failed": 0,
             "db_saved": 0,
             "db_failed": 0,
-            "by_region": {},
-            "by_province": {}
+            "by_region": Counter(),
+            "by_province": Counter()
         }
         
-        # เก็บข้อมูลพัสดุทั้งหมด
-        self.parcels = []
+        # เก็บข้อมูลพัสดุทั้งหมดแบบ column (dict ของ list) แทน list ของ dict ทั้งก้อน
+        self.parcels = {column: [] for column in PARCEL_COLUMNS}
+    
+    def _bump(self, key: str):
+        """เพิ่มตัวนับสถิติแบบ thread-safe"""
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    def _append_parcel(self, result: ParcelResult):
+        """เพิ่มพัสดุลง self.parcels (เรียกภายใต้ _stats_lock)"""
+        data = result.data or {}
+        sender = data.get("sender") or {}
+        recipient = data.get("recipient") or {}
+        if not isinstance(sender, dict):
+            sender = {}
+        if not isinstance(recipient, dict):
+            recipient = {}
+        row = (
+            result.image_file, result.tracking_number, result.province, result.region,
+            sender.get("name", ""), sender.get("phone", ""), sender.get("province", ""),
+            recipient.get("name", ""), recipient.get("phone", ""), recipient.get("province", ""),
+        )
+        for column, value in zip(PARCEL_COLUMNS, row):
+            self.parcels[column].append(value)
+    
+    def _apply_db_response(self, result: ParcelResult, db_response: Dict):
+        """บันทึกผลการบันทึก Database ลงใน result และสถิติ"""
+        if db_response.get('success'):
+            result.db_saved = True
+            result.db_parcel_id = db_response.get('parcel_id')
+            result.db_sender_id = db_response.get('sender_id')
+            result.db_recipient_id = db_response.get('recipient_id')
+            self._bump("db_saved")
+            log.info("✅ บันทึกลง Database สำเร็จ - Parcel ID: %s", result.db_parcel_id)
+        else:
+            result.db_saved = False
+            result.db_error = db_response.get('message')
+            self._bump("db_failed")
+            log.error("❌ บันทึกลง Database ไม่สำเร็จ: %s", result.db_error)
+    
+    def _flush_db(self, pending: List[ParcelResult]):
+        """บันทึกพัสดุที่รอไว้ลง Database ใน request เดียว แล้วล้าง pending"""
+        if not pending:
+            return
+        # ข้อมูลพัสดุที่เหมือนกันทุก field (ภาพฉลากเดียวกันซ้ำในชุด) ส่งไปบันทึกครั้งเดียว
+        unique = {}
+        for result in pending:
+            key = json.dumps(result.data, ensure_ascii=False, sort_keys=True)
+            unique.setdefault(key, []).append(result)
+        groups = list(unique.values())
+        if len(groups) < len(pending):
+            log.info("♻️  ข้ามพัสดุซ้ำ %d รายการ", len(pending) - len(groups))
+        
+        log.debug("\n💾 กำลังบันทึกข้อมูล %s รายการลง Database...", len(groups))
+        responses = self.db_api.save_parcels_bulk([group[0].data for group in groups])
+        for group, db_response in zip(groups, responses):
+            first = group[0]
+            self._apply_db_response(first, db_response)  # นับสถิติ Database ครั้งเดียวต่อ 1 แถวที่บันทึกจริง
+            # รายการซ้ำไม่ได้บันทึกเอง: db_saved=False แต่อ้างอิง ID ของแถวที่บันทึกจากรายการแรก
+            for duplicate in group[1:]:
+                duplicate.db_parcel_id = first.db_parcel_id
+                duplicate.db_sender_id = first.db_sender_id
+                duplicate.db_recipient_id = first.db_recipient_id
+                log.debug("♻️  [%s] ซ้ำกับ %s (Parcel ID: %s)",
+                          duplicate.image_file, first.image_file, first.db_parcel_id)
+        pending.clear()
+    
+    def _province_folder(self, province: str) -> str:
+        """path โฟลเดอร์ของจังหวัดใน sorted_folder (สร้างครั้งแรกที่ใช้)"""
+        province_folder = os.path.join(self.sorted_folder, province)
+        if province_folder not in self._province_folders:
+            # หลาย thread อาจสร้างพร้อมกันได้ - exist_ok ทำให้ไม่ error จึงไม่ต้องใช้ lock
+            os.makedirs(province_folder, exist_ok=True)
+            self._province_folders.add(province_folder)
+        return province_folder
     
     def get_region(self, province: str) -> str:
         """หาภาคจากจังหวัด"""
-        for region, provinces in self.region_mapping.items():
-            if province in provinces:
-                return region
-        return "ไม่ระบุภาค"
+        return self._province_to_region.get(province, "ไม่ระบุภาค")
+    
+    def _scan_province_hs(self, text: str) -> Optional[str]:
+        """สแกนชื่อจังหวัดด้วย Hyperscan: คืนชื่อที่เริ่มก่อน (ยาวที่สุดถ้าเริ่มตำแหน่งเดียวกัน) เหมือน iter_long"""
+        scratch = getattr(self._hs_local, 'scratch', None)
+        if scratch is None:
+            scratch = self._hs_local.scratch = hyperscan.Scratch(self._province_hs)
+        matches = []
+        
+        def on_match(match_id, start, end, flags, context):
+            matches.append((start, start - end, match_id))
+        
+        self._province_hs.scan(text.encode('utf-8'), match_event_handler=on_match, scratch=scratch)
+        if not matches:
+            return None
+        return self._province_nospace[min(matches)[2]][1]
     
     def extract_province_from_text(self, text: str) -> Optional[str]:
         """
@@ -359,39 +933,54 @@ class CompleteParcelSortingSystem:
         # ทำความสะอาดข้อความ
         text = text.strip()
         
-        # Pattern 1: จ.ชื่อจังหวัด หรือ จังหวัดชื่อจังหวัด
-        province_patterns = [
-            r'จ\.([^\s\d]+)',
-            r'จังหวัด([^\s\d]+)',
-        ]
+        # ส่วนใหญ่ OCR ให้ชื่อจังหวัดมาตรง ๆ (จาก field province) - ไม่ต้องสแกนต่อ
+        if text in self._province_set:
+            return text
+        province = PROVINCE_ALIASES.get(text)
+        if province:
+            return province
         
-        for pattern in province_patterns:
-            match = re.search(pattern, text)
+        # Pattern 1: จ.ชื่อจังหวัด หรือ จังหวัดชื่อจังหวัด
+        for pattern in PROVINCE_MARKER_RES:
+            match = pattern.search(text)
             if match:
                 province_candidate = match.group(1).strip()
-                # ตรวจสอบว่าตรงกับจังหวัดที่มีหรือไม่
-                for province in self.all_provinces:
-                    if province_candidate == province or province_candidate in province:
-                        return province
+                if province_candidate in self._province_set:
+                    return province_candidate
+                # ตรวจสอบว่าเป็นส่วนหนึ่งของชื่อจังหวัดที่มีหรือไม่
+                province = next((p for p in self.all_provinces if province_candidate in p), None)
+                if province:
+                    return province
         
         # Pattern 2: ค้นหาชื่อจังหวัดโดยตรง
-        for province in self.all_provinces:
-            # ตรงทั้งหมด
-            if province in text:
+        text_no_space = text.replace(" ", "")
+        if self._province_hs is not None:
+            province = self._scan_province_hs(text_no_space)
+            if province:
                 return province
-            
-            # ตรงแบบไม่มีช่องว่าง
-            province_no_space = province.replace(" ", "")
-            text_no_space = text.replace(" ", "")
-            if province_no_space in text_no_space:
+        elif self._province_ac is not None:
+            # สแกนข้อความรอบเดียว ได้ชื่อที่ยาวที่สุดซึ่งเจอก่อน (ชื่อจังหวัดไม่มีช่องว่าง จึงครอบคลุมการเทียบกับ text ด้วย)
+            for _, province in self._province_ac.iter_long(text_no_space):
                 return province
+        else:
+            # ชื่อจังหวัดไม่มีช่องว่าง: ถ้าเจอใน text ก็ต้องเจอใน text_no_space ด้วย จึงเช็คครั้งเดียวพอ
+            # ใช้กฎเดียวกับ iter_long / Hyperscan: ชื่อที่เจอก่อนในข้อความ (ยาวที่สุดถ้าเริ่มตำแหน่งเดียวกัน)
+            # ผลจึงไม่ขึ้นกับว่าเครื่องนั้นติดตั้ง package เสริมตัวไหนไว้
+            matches = [(pos, -len(province_no_space), province)
+                       for province_no_space, province in self._province_nospace
+                       for pos in (text_no_space.find(province_no_space),) if pos != -1]
+            if matches:
+                return min(matches)[2]
         
         # Pattern 3: ลองแบบ fuzzy matching
-        text_words = set(re.findall(r'[\u0E00-\u0E7F]+', text))
-        for province in self.all_provinces:
-            province_words = set(re.findall(r'[\u0E00-\u0E7F]+', province))
-            if province_words.intersection(text_words):
-                return province
+        word_ids = [self._word_to_id[w] for w in set(THAI_WORD_RE.findall(text)) if w in self._word_to_id]
+        if word_ids:
+            text_vec = np.zeros(len(self._word_to_id), dtype=np.float32)
+            text_vec[word_ids] = 1.0
+            scores = self._province_word_mat @ text_vec
+            best = int(scores.argmax())  # คะแนนเท่ากันได้จังหวัดที่อยู่ก่อนในรายชื่อ
+            if scores[best] > 0:
+                return self.all_provinces[best]
         
         return None
     
@@ -402,40 +991,18 @@ class CompleteParcelSortingSystem:
         Returns:
             (sender_text, recipient_text)
         """
-        print("\n🧠 กำลังใช้ NLP แยกผู้ส่ง-ผู้รับ...")
-        
-        # Method 1: หาด้วยคำว่า "ผู้ส่ง" และ "ผู้รับ" (ภาษาไทย)
-        sender_markers = [
-            r'ผู้ส่ง\s*[:：]?',
-            r'sender\s*[:：]?',
-            r'from\s*[:：]?'
-        ]
-        
-        recipient_markers = [
-            r'ผู้รับ\s*[:：]?',
-            r'recipient\s*[:：]?',
-            r'to\s*[:：]?'
-        ]
-        
-        # หา position ของ marker แต่ละตัว
-        sender_positions = []
-        recipient_positions = []
-        
-        for pattern in sender_markers:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
-                sender_positions.append(match.start())
+        log.debug("\n🧠 กำลังใช้ NLP แยกผู้ส่ง-ผู้รับ...")
         
-        for pattern in recipient_markers:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
-                recipient_positions.append(match.start())
+        # Method 1: หาด้วยคำว่า "ผู้ส่ง" และ "ผู้รับ" (ภาษาไทย) - SENDER_MARKER_RE / RECIPIENT_MARKER_RE
+        # หา marker แรกของแต่ละฝั่ง
+        sender_match = SENDER_MARKER_RE.search(text)
+        recipient_match = RECIPIENT_MARKER_RE.search(text) if sender_match else None
         
         # ถ้าเจอทั้งสอง marker
-        if sender_positions and recipient_positions:
-            # เอา marker แรกของแต่ละฝั่ง
-            sender_start = min(sender_positions)
-            recipient_start = min(recipient_positions)
-            
-            print(f"   ✅ เจอ marker: ผู้ส่ง @{sender_start}, ผู้รับ @{recipient_start}")
+        if sender_match and recipient_match:
+            sender_start = sender_match.start()
+            recipient_start = recipient_match.start()
+            log.debug("   ✅ เจอ marker: ผู้ส่ง @%s, ผู้รับ @%s", sender_start, recipient_start)
             
             if sender_start < recipient_start:
                 sender_text = text[sender_start:recipient_start].strip()
@@ -447,10 +1014,9 @@ class CompleteParcelSortingSystem:
             return sender_text, recipient_text
         
         # Method 2: ถ้าไม่เจอ marker ชัดเจน ลองแบ่งตามลำดับการปรากฏของข้อมูล
-        print("   ⚠️ ไม่เจอ marker ชัดเจน - ใช้วิธีแบ่งตามโครงสร้าง...")
+        log.debug("   ⚠️ ไม่เจอ marker ชัดเจน - ใช้วิธีแบ่งตามโครงสร้าง...")
         
-        phone_pattern = r'(?:โทร|tel|phone)\s*[:：]?\s*[0-9\s\-]{9,}'
-        phones = list(re.finditer(phone_pattern, text, re.IGNORECASE))
+        phones = list(PHONE_LABEL_RE.finditer(text))
         
         if len(phones) >= 2:
             # แบ่งระหว่างเบอร์โทร set แรกกับ set ที่สอง
@@ -458,8 +1024,8 @@ class CompleteParcelSortingSystem:
             
             # ถอยหลังไปหา marker ของผู้รับ
             before_split = text[:split_point]
-            for pattern in recipient_markers:
-                match = re.search(pattern + r'.*$', before_split, re.IGNORECASE)
+            for pattern in RECIPIENT_MARKERS_TO_END:
+                match = pattern.search(before_split)
                 if match:
                     split_point = match.start()
                     break
@@ -467,11 +1033,11 @@ class CompleteParcelSortingSystem:
             sender_text = text[:split_point].strip()
             recipient_text = text[split_point:].strip()
             
-            print(f"   ✅ แบ่งตามเบอร์โทร @ position {split_point}")
+            log.debug("   ✅ แบ่งตามเบอร์โทร @ position %s", split_point)
             return sender_text, recipient_text
         
         # Method 3: แบ่งครึ่ง (fallback)
-        print("   ⚠️ ใช้วิธี fallback: แบ่งครึ่ง")
+        log.debug("   ⚠️ ใช้วิธี fallback: แบ่งครึ่ง")
         lines = text.split('\n')
         mid = len(lines) // 2
         
@@ -487,25 +1053,23 @@ class CompleteParcelSortingSystem:
         if not isinstance(data, dict):
             return data
         
-        print("\n🔧 ตรวจสอบโครงสร้าง JSON...")
+        log.debug("\n🔧 ตรวจสอบโครงสร้าง JSON...")
         
         # กรณี 1: sender เป็น string ยาว ๆ (ผิดปกติ)
         sender = data.get('sender', {})
         
         if isinstance(sender, str) and len(sender) > 100:
-            print("   ⚠️ ตรวจพบ: sender เป็น string ยาว (ไม่ใช่ dict)")
-            print(f"   📏 ความยาว: {len(sender)} ตัวอักษร")
+            log.debug("   ⚠️ ตรวจพบ: sender เป็น string ยาว (ไม่ใช่ dict)")
+            log.debug("   📏 ความยาว: %s ตัวอักษร", len(sender))
             
             # แยกข้อความออกเป็นผู้ส่ง-ผู้รับ
             sender_text, recipient_text = self.smart_split_sender_recipient(sender)
             
-            print(f"\n   📤 ส่วนผู้ส่ง ({len(sender_text)} ตัวอักษร):")
-            print("   " + "-" * 50)
-            print("   " + sender_text[:150].replace('\n', '\n   '))
-            
-            print(f"\n   📥 ส่วนผู้รับ ({len(recipient_text)} ตัวอักษร):")
-            print("   " + "-" * 50)
-            print("   " + recipient_text[:150].replace('\n', '\n   '))
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("\n   📤 ส่วนผู้ส่ง (%s ตัวอักษร):\n   %s\n   %s", len(sender_text),
+                          "-" * 50, sender_text[:150].replace('\n', '\n   '))
+                log.debug("\n   📥 ส่วนผู้รับ (%s ตัวอักษร):\n   %s\n   %s", len(recipient_text),
+                          "-" * 50, recipient_text[:150].replace('\n', '\n   '))
             
             # แปลงเป็น dict
             sender_dict = self._extract_person_info(sender_text, is_recipient=False)
@@ -515,17 +1079,17 @@ class CompleteParcelSortingSystem:
             data['sender'] = sender_dict
             data['recipient'] = recipient_dict
             
-            print("\n   ✅ แก้ไขโครงสร้าง JSON สำเร็จ")
+            log.debug("\n   ✅ แก้ไขโครงสร้าง JSON สำเร็จ")
         
         # กรณี 2: มี recipient แล้ว แต่เป็น string
         elif isinstance(data.get('recipient'), str):
-            print("   ⚠️ ตรวจพบ: recipient เป็น string (ควรเป็น dict)")
+            log.debug("   ⚠️ ตรวจพบ: recipient เป็น string (ควรเป็น dict)")
             recipient_text = data.get('recipient', '')
             data['recipient'] = self._extract_person_info(recipient_text, is_recipient=True)
         
         # กรณี 3: ไม่มี recipient เลย
         elif 'recipient' not in data or not data['recipient']:
-            print("   ⚠️ ตรวจพบ: ไม่มีข้อมูล recipient")
+            log.debug("   ⚠️ ตรวจพบ: ไม่มีข้อมูล recipient")
             
             # ลองหาจาก sender (กรณี OCR ใส่รวมกัน)
             if isinstance(sender, str):
@@ -540,51 +1104,75 @@ class CompleteParcelSortingSystem:
         if not data:
             return data
         
-        print("\n🔍 กำลังตรวจสอบและแก้ไขจังหวัด...")
+        log.debug("\n🔍 กำลังตรวจสอบและแก้ไขจังหวัด...")
         
         # ตรวจสอบและแก้ไขชื่อจังหวัดของผู้ส่ง
         sender = data.get('sender', {})
         if isinstance(sender, dict):
             sender_province = sender.get('province', '')
             if sender_province:
-                print(f"   📤 ผู้ส่ง - จังหวัด: '{sender_province}'")
+                log.debug("   📤 ผู้ส่ง - จังหวัด: '%s'", sender_province)
                 normalized = self.extract_province_from_text(sender_province)
                 if normalized:
                     sender['province'] = normalized
-                    print(f"       → ปรับเป็น: '{normalized}' ✅")
+                    log.debug("       → ปรับเป็น: '%s' ✅", normalized)
         
         # ตรวจสอบและแก้ไขชื่อจังหวัดของผู้รับ (สำคัญ!)
         recipient = data.get('recipient', {})
         if isinstance(recipient, dict):
             recipient_province = recipient.get('province', '')
-            print(f"   📥 ผู้รับ - จังหวัดเดิม: '{recipient_province}'")
+            # กรณีส่วนใหญ่: OCR ให้ชื่อจังหวัดที่ถูกต้องมาแล้ว - ไม่ต้องค้นหรือ log เพิ่ม
+            # (เช็ค str ก่อน: OCR อาจให้ list/dict ซึ่งใช้กับ frozenset ไม่ได้)
+            if isinstance(recipient_province, str) and recipient_province in self._province_set:
+                return data
+            
+            log.debug("   📥 ผู้รับ - จังหวัดเดิม: '%s'", recipient_province)
             
             if recipient_province:
                 normalized = self.extract_province_from_text(recipient_province)
                 if normalized:
                     recipient['province'] = normalized
-                    print(f"       → ปรับเป็น: '{normalized}' ✅")
+                    log.debug("       → ปรับเป็น: '%s' ✅", normalized)
                 else:
-                    print(f"       → ไม่ตรงกับจังหวัดที่มี - ลองหาจากที่อยู่...")
+                    log.debug("       → ไม่ตรงกับจังหวัดที่มี - ลองหาจากที่อยู่...")
                     address = recipient.get('address', '')
                     if address:
                         normalized = self.extract_province_from_text(address)
                         if normalized:
                             recipient['province'] = normalized
-                            print(f"       → พบจากที่อยู่: '{normalized}' ✅")
+                            log.debug("       → พบจากที่อยู่: '%s' ✅", normalized)
             else:
-                print(f"       → ไม่มีข้อมูลจังหวัด - ลองหาจากที่อยู่...")
+                log.debug("       → ไม่มีข้อมูลจังหวัด - ลองหาจากที่อยู่...")
                 address = recipient.get('address', '')
                 if address:
                     normalized = self.extract_province_from_text(address)
                     if normalized:
                         recipient['province'] = normalized
-                        print(f"       → พบจากที่อยู่: '{normalized}' ✅")
+                        log.debug("       → พบจากที่อยู่: '%s' ✅", normalized)
                     else:
-                        print(f"       → ไม่พบจังหวัด ❌")
+                        log.debug("       → ไม่พบจังหวัด ❌")
         
         return data
     
+    def _finalize_parcel_data(self, data: Dict) -> Tuple[Dict, str]:
+        """
+        แก้โครงสร้าง JSON + ปรับชื่อจังหวัด แล้วคืนจังหวัดปลายทาง (จากผู้รับเท่านั้น) ในรอบเดียว
+        normalize_province_data ค้นจากที่อยู่ผู้รับให้แล้วถ้าไม่มีจังหวัด จึงไม่ต้องค้นซ้ำ
+        """
+        data = self.normalize_ocr_json_result(data)
+        data = self.normalize_province_data(data)
+        
+        recipient = data.get('recipient', {})
+        province = recipient.get('province') if isinstance(recipient, dict) else None
+        if province and province != 'ไม่ระบุ':
+            return data, province
+        
+        if isinstance(recipient, dict):
+            log.error("❌ ไม่พบจังหวัดในข้อมูลผู้รับ")
+        else:
+            log.error("❌ ข้อมูลผู้รับไม่ถูกต้อง: %s", type(recipient))
+        return data, 'ไม่ระบุ'
+    
     def determine_delivery_route(self, province: str, region: str) -> str:
         """กำหนดเส้นทางการส่งพัสดุ"""
         if province == "ไม่ระบุ" or region == "ไม่ระบุภาค":
@@ -605,35 +1193,19 @@ class CompleteParcelSortingSystem:
     def parse_ocr_result(self, ocr_text: str) -> Optional[Dict]:
         """แปลงผลลัพธ์ OCR เป็น JSON - รองรับหลายรูปแบบ"""
         try:
-            # ลบ markdown code blocks
+            # ลบ markdown code blocks (ผลจาก streaming เป็น JSON ล้วนอยู่แล้ว ส่วนใหญ่จึงข้ามขั้นนี้)
             text = ocr_text.strip()
-            text = re.sub(r'^```json\s*', '', text)
-            text = re.sub(r'^```\s*', '', text)
-            text = re.sub(r'\s*```', '', text)
-            text = text.strip()
+            if '`' in text:
+                text = JSON_FENCE_OPEN_JSON_RE.sub('', text)
+                text = JSON_FENCE_OPEN_RE.sub('', text)
+                text = JSON_FENCE_CLOSE_RE.sub('', text)
+                text = text.strip()
             
-            # ลองแปลง JSON
-            try:
-                data = json.loads(text)
-                if isinstance(data, dict):
-                    return data
-            except json.JSONDecodeError:
-                pass
-            
-            # ลองหา JSON object
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
-            if json_match:
-                try:
-                    data = json.loads(json_match.group())
-                    if isinstance(data, dict):
-                        return data
-                except json.JSONDecodeError:
-                    pass
-            
-            return None
+            # decode ครั้งเดียวจาก '{' ตัวแรก (ไม่ต้อง json.loads ทั้งก้อนก่อนแล้วค่อยหาใหม่เมื่อล้มเหลว)
+            return _find_json_object(text)
             
         except Exception as e:
-            print(f"❌ Error parsing JSON: {e}")
+            log.error("❌ Error parsing JSON: %s", e)
             return None
     
     def _extract_person_info(self, text: str, is_recipient: bool = False) -> Dict:
@@ -641,102 +1213,83 @@ class CompleteParcelSortingSystem:
         info = {"name": "", "phone": "", "address": "", "province": ""}
         
         try:
-            prefix = "   📥" if is_recipient else "   📤"
+            prefix = PERSON_LOG_PREFIX[is_recipient]
             
             # Extract name
-            name_patterns = [
-                r'(?:ชื่อ|name)[:\s]*([^\n\r]+?)(?=\n|ที่อยู่|address|โทร|tel|$)',
-                r'^([^\n\r]+?)(?=\n)',  # first line
-            ]
-            for pattern in name_patterns:
-                match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+            for pattern in NAME_PATTERNS:
+                match = pattern.search(text)
                 if match:
                     name = match.group(1).strip()
                     # Clean up
-                    name = re.sub(r'(?:ชื่อ|name)[:\s]*', '', name, flags=re.IGNORECASE)
+                    name = NAME_LABEL_RE.sub('', name)
                     if name and len(name) > 2:
                         info["name"] = name
-                        print(f"{prefix} ชื่อ: {name}")
+                        log.debug("%s ชื่อ: %s", prefix, name)
                         break
             
             # Extract phone
-            phone_patterns = [
-                r'(?:โทร|tel|phone)[:\s]*([0-9\s\-]{9,})',
-                r'\b(0\d{2}[\s\-]?\d{3}[\s\-]?\d{4})\b',
-                r'\b(\d{3}[\s\-]?\d{3}[\s\-]?\d{4})\b'
-            ]
-            for pattern in phone_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+            for pattern in PHONE_PATTERNS:
+                match = pattern.search(text)
                 if match:
                     phone = match.group(1).strip()
-                    phone = re.sub(r'[^\d]', '', phone)  # keep only digits
+                    phone = NON_DIGIT_RE.sub('', phone)  # keep only digits
                     if len(phone) >= 9:
                         info["phone"] = phone
-                        print(f"{prefix} โทร: {phone}")
+                        log.debug("%s โทร: %s", prefix, phone)
                         break
             
             # Extract address and province
-            address_patterns = [
-                r'(?:ที่อยู่|address)[:\s]*([^\n\r]+?)(?=\n(?:โทร|tel)|$)',
-                r'(?:จ\.|จังหวัด)[\s]*([^\n\r]+)',
-            ]
-            
-            for pattern in address_patterns:
-                match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+            for pattern in ADDRESS_PATTERNS:
+                match = pattern.search(text)
                 if match:
                     address = match.group(1).strip()
                     # Clean up
-                    address = re.sub(r'(?:ที่อยู่|address)[:\s]*', '', address, flags=re.IGNORECASE)
+                    address = ADDRESS_LABEL_RE.sub('', address)
                     if address:
                         info["address"] = address
-                        print(f"{prefix} ที่อยู่: {address[:50]}...")
+                        log.debug("%s ที่อยู่: %s...", prefix, address[:50])
                         break
             
             # หาจังหวัดโดยเฉพาะสำหรับผู้รับ
             if is_recipient:
-                print(f"{prefix} 🎯 กำลังค้นหาจังหวัดปลายทาง...")
+                log.debug("%s 🎯 กำลังค้นหาจังหวัดปลายทาง...", prefix)
                 
                 # Layer 1: หาจากที่อยู่
                 if info["address"]:
                     province = self.extract_province_from_text(info["address"])
                     if province:
                         info["province"] = province
-                        print(f"{prefix} ✅ พบจังหวัดจากที่อยู่: '{province}'")
+                        log.debug("%s ✅ พบจังหวัดจากที่อยู่: '%s'", prefix, province)
                 
                 # Layer 2: หาจากทั้งข้อความ
                 if not info["province"]:
                     province = self.extract_province_from_text(text)
                     if province:
                         info["province"] = province
-                        print(f"{prefix} ✅ พบจังหวัดจากข้อความทั้งหมด: '{province}'")
+                        log.debug("%s ✅ พบจังหวัดจากข้อความทั้งหมด: '%s'", prefix, province)
                 
                 # Layer 3: หาจาก pattern "จ." หรือ "จังหวัด"
                 if not info["province"]:
-                    province_patterns = [
-                        r'(?:จ\.|จังหวัด)\s*([^\s\d,]+)',
-                    ]
-                    for pattern in province_patterns:
-                        match = re.search(pattern, text)
-                        if match:
-                            province_name = match.group(1).strip()
-                            province = self.extract_province_from_text(province_name)
-                            if province:
-                                info["province"] = province
-                                print(f"{prefix} ✅ พบจังหวัดจาก pattern: '{province}'")
-                                break
+                    match = PROVINCE_PREFIX_RE.search(text)
+                    if match:
+                        province_name = match.group(1).strip()
+                        province = self.extract_province_from_text(province_name)
+                        if province:
+                            info["province"] = province
+                            log.debug("%s ✅ พบจังหวัดจาก pattern: '%s'", prefix, province)
                 
                 if not info["province"]:
-                    print(f"{prefix} ❌ ไม่พบจังหวัดในข้อความผู้รับ")
+                    log.debug("%s ❌ ไม่พบจังหวัดในข้อความผู้รับ", prefix)
             else:
                 # ผู้ส่ง: หาจังหวัดแบบธรรมดา
                 if info["address"]:
                     province = self.extract_province_from_text(info["address"])
                     if province:
                         info["province"] = province
-                        print(f"{prefix} จังหวัด: {province}")
+                        log.debug("%s จังหวัด: %s", prefix, province)
             
         except Exception as e:
-            print(f"⚠️ Error parsing person info: {e}")
+            log.warning("⚠️ Error parsing person info: %s", e)
         
         return info
     
@@ -749,23 +1302,19 @@ class CompleteParcelSortingSystem:
         }
         
         try:
-            print("\n🔍 กำลังแยกบริบทผู้ส่งและผู้รับ...")
+            log.debug("\n🔍 กำลังแยกบริบทผู้ส่งและผู้รับ...")
             
             # ใช้ฟังก์ชันใหม่ในการแยก
             sender_text, recipient_text = self.smart_split_sender_recipient(text)
             
             # Debug: แสดงข้อความที่แยกได้
-            if sender_text:
-                print(f"\n📤 ข้อความฝั่งผู้ส่ง:")
-                print("-" * 60)
-                print(sender_text[:200] + "..." if len(sender_text) > 200 else sender_text)
-                print("-" * 60)
-            
-            if recipient_text:
-                print(f"\n📥 ข้อความฝั่งผู้รับ (FOCUS ที่นี่):")
-                print("-" * 60)
-                print(recipient_text[:200] + "..." if len(recipient_text) > 200 else recipient_text)
-                print("-" * 60)
+            if log.isEnabledFor(logging.DEBUG):
+                if sender_text:
+                    log.debug("\n📤 ข้อความฝั่งผู้ส่ง:\n%s\n%s\n%s", "-" * 60,
+                              sender_text[:200] + "..." if len(sender_text) > 200 else sender_text, "-" * 60)
+                if recipient_text:
+                    log.debug("\n📥 ข้อความฝั่งผู้รับ (FOCUS ที่นี่):\n%s\n%s\n%s", "-" * 60,
+                              recipient_text[:200] + "..." if len(recipient_text) > 200 else recipient_text, "-" * 60)
             
             # Extract ข้อมูลผู้ส่ง
             if sender_text:
@@ -776,278 +1325,258 @@ class CompleteParcelSortingSystem:
                 result["recipient"] = self._extract_person_info(recipient_text, is_recipient=True)
             
             # Extract tracking number
-            tracking_patterns = [
-                r'tracking[_\s]*(?:number)?[:\s]*([A-Z0-9]+)',
-                r'เลข(?:พัสดุ|ติดตาม)?[:\s]*([A-Z0-9]+)',
-                r'\b([A-Z]{2,}\d{8,})\b'
-            ]
-            
-            for pattern in tracking_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+            for pattern in TRACKING_PATTERNS:
+                match = pattern.search(text)
                 if match:
                     result["tracking_number"] = match.group(1).strip()
                     break
             
         except Exception as e:
-            print(f"⚠️ Error extracting text: {e}")
-            import traceback
-            traceback.print_exc()
+            log.warning("⚠️ Error extracting text: %s", e, exc_info=log.isEnabledFor(logging.DEBUG))
         
         return result
     
     def process_single_parcel(self, image_path: str, enhance_image: bool = True, 
-                             save_to_db: bool = True) -> Dict:
-        """ประมวลผลพัสดุเดียวแบบครบวงจร (รองรับ Database)"""
-        print(f"\n📦 กำลังประมวลผลพัสดุ: {os.path.basename(image_path)}")
+                             save_to_db: bool = True, image_bytes: Optional[bytes] = None,
+                             enhanced_bytes: Optional[bytes] = None) -> ParcelResult:
+        """ประมวลผลพัสดุเดียวแบบครบวงจร (รองรับ Database)
         
-        result = {
-            "success": False,
-            "image_file": os.path.basename(image_path),
-            "image_path": image_path,
-            "tracking_number": None,
-            "province": None,
-            "region": None,
-            "data": None,
-            "db_saved": False,
-            "db_parcel_id": None,
-            "error": None,
-            "timestamp": datetime.now().isoformat()
-        }
+        image_bytes: JPEG ในหน่วยความจำ (จากกล้องโดยตรง) - ถ้ามีจะไม่อ่านภาพจาก image_path
+        enhanced_bytes: ภาพที่ปรับปรุงไว้แล้ว (จาก enhance_batch) - ถ้ามีจะข้ามขั้นตอนปรับปรุงภาพ
+        """
+        log.debug("\n📦 กำลังประมวลผลพัสดุ: %s", os.path.basename(image_path))
+        
+        result = ParcelResult(
+            image_file=os.path.basename(image_path),
+            image_path=image_path,
+            timestamp=datetime.now().isoformat()
+        )
         
         try:
-            # 1. ปรับปรุงภาพถ้าต้องการ
-            processed_image = image_path
-            if enhance_image:
-                print("📸 กำลังปรับปรุงคุณภาพภาพ...")
-                processed_image = self.preprocessor.enhance_image(image_path)
-                print(f"✅ ปรับปรุงภาพสำเร็จ")
-            
-            # 2. อ่านข้อมูลด้วย OCR
-            print("🔍 กำลังอ่านข้อมูลด้วย Typhoon Vision OCR...")
-            ocr_result = self.ocr.extract_text_from_image(processed_image)
+            # 1. ปรับปรุงภาพถ้าต้องการ (ได้ JPEG bytes ในหน่วยความจำ ไม่ผ่านไฟล์ชั่วคราว)
+            ocr_bytes = image_bytes
+            if enhanced_bytes is None and enhance_image:
+                log.debug("📸 กำลังปรับปรุงคุณภาพภาพ...")
+                enhanced_bytes = self.preprocessor.enhance_image(image_path, image_bytes)
+            if enhanced_bytes is not None:
+                ocr_bytes = enhanced_bytes
+            
+            # 2. อ่านข้อมูลด้วย OCR (ปรับปรุงไม่สำเร็จจะใช้ภาพต้นฉบับแทน)
+            log.debug("🔍 กำลังอ่านข้อมูลด้วย Typhoon Vision OCR...")
+            ocr_result = self.ocr.extract_text_from_image(image_path, ocr_bytes)
             
             if not ocr_result:
-                result["error"] = "ไม่สามารถอ่านข้อมูลจากภาพได้"
-                self.stats["failed"] += 1
-                print(f"❌ {result['error']}")
+                result.error = "ไม่สามารถอ่านข้อมูลจากภาพได้"
+                self._bump("failed")
+                log.error("❌ [%s] %s", result.image_file, result.error)
                 return result
             
             # Debug: แสดงผล OCR ดิบ
-            print(f"\n📝 OCR Result (raw):")
-            print("=" * 60)
-            print(ocr_result[:500] + "..." if len(ocr_result) > 500 else ocr_result)
-            print("=" * 60)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("\n📝 OCR Result (raw):\n%s\n%s\n%s", "=" * 60,
+                          ocr_result[:500] + "..." if len(ocr_result) > 500 else ocr_result, "=" * 60)
             
             # 3. แปลงผลลัพธ์เป็น JSON
             parcel_data = self.parse_ocr_result(ocr_result)
             
             # ถ้าไม่ได้ JSON ให้ลองแยกข้อมูลจาก text
             if not parcel_data:
-                print("⚠️ ไม่ได้รับ JSON จาก OCR - ลองแยกข้อมูลจาก text...")
+                log.warning("⚠️ ไม่ได้รับ JSON จาก OCR - ลองแยกข้อมูลจาก text...")
                 
                 if isinstance(ocr_result, str):
                     parcel_data = self.extract_data_from_text(ocr_result)
                 else:
-                    result["error"] = "ไม่สามารถแปลงข้อมูลเป็น JSON ได้"
-                    result["raw_ocr"] = ocr_result
-                    self.stats["failed"] += 1
-                    print(f"❌ {result['error']}")
+                    result.error = "ไม่สามารถแปลงข้อมูลเป็น JSON ได้"
+                    result.raw_ocr = ocr_result
+                    self._bump("failed")
+                    log.error("❌ [%s] %s", result.image_file, result.error)
                     return result
             
             # ถ้ายังไม่ได้ข้อมูล
             if not parcel_data or (not parcel_data.get('sender') and not parcel_data.get('recipient')):
-                result["error"] = "ไม่สามารถดึงข้อมูลพัสดุได้"
-                result["raw_ocr"] = ocr_result
-                self.stats["failed"] += 1
-                print(f"❌ {result['error']}")
+                result.error = "ไม่สามารถดึงข้อมูลพัสดุได้"
+                result.raw_ocr = ocr_result
+                self._bump("failed")
+                log.error("❌ [%s] %s", result.image_file, result.error)
                 return result
             
             # Debug: แสดงข้อมูลที่ได้จาก OCR
-            print(f"📄 ข้อมูลที่อ่านได้:")
-            print(json.dumps(parcel_data, ensure_ascii=False, indent=2))
-            
-            # 3.5 🎯 ใช้ฟังก์ชันใหม่: แก้ไขโครงสร้าง JSON
-            parcel_data = self.normalize_ocr_json_result(parcel_data)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("📄 ข้อมูลที่อ่านได้:\n%s", json.dumps(parcel_data, ensure_ascii=False, indent=2))
             
-            # 3.6 ปรับแต่งชื่อจังหวัดให้ถูกต้อง
-            parcel_data = self.normalize_province_data(parcel_data)
+            # 3.5 แก้ไขโครงสร้าง JSON + ปรับชื่อจังหวัด + หาจังหวัดปลายทาง (รอบเดียว)
+            parcel_data, province = self._finalize_parcel_data(parcel_data)
             
             # Debug: แสดงข้อมูลหลัง normalize
-            print(f"📝 ข้อมูลหลังปรับแต่ง:")
-            print(json.dumps(parcel_data, ensure_ascii=False, indent=2))
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("📝 ข้อมูลหลังปรับแต่ง:\n%s", json.dumps(parcel_data, ensure_ascii=False, indent=2))
             
             # 4. สร้าง tracking number ถ้าไม่มี
             tracking = parcel_data.get('tracking_number')
             if not tracking or tracking == "":
-                tracking = f"PKG{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                tracking = f"{self._tracking_prefix}{next(self._tracking_seq):06d}"
                 parcel_data['tracking_number'] = tracking
             
-            # 5. ดึงข้อมูลจังหวัดปลายทาง
-            recipient = parcel_data.get('recipient', {})
-            province = 'ไม่ระบุ'
-            
-            print("\n" + "="*60)
-            print("🎯 กำลังกำหนดจังหวัดปลายทาง (จากผู้รับเท่านั้น)")
-            print("="*60)
-            
-            if isinstance(recipient, dict):
-                province = recipient.get('province', '')
-                
-                if province and province != 'ไม่ระบุ':
-                    print(f"✅ พบจังหวัดจากข้อมูลผู้รับ: '{province}'")
-                else:
-                    print("⚠️ ไม่มีจังหวัดในข้อมูลผู้รับ - กำลังค้นหา...")
-                    
-                    recipient_address = recipient.get('address', '')
-                    if recipient_address:
-                        print(f"🔍 ค้นหาจากที่อยู่ผู้รับ: '{recipient_address[:50]}...'")
-                        found_province = self.extract_province_from_text(recipient_address)
-                        if found_province:
-                            province = found_province
-                            recipient['province'] = province
-                            print(f"✅ พบจังหวัดจากที่อยู่ผู้รับ: '{province}'")
-                    
-                    if not province or province == 'ไม่ระบุ':
-                        print("❌ ไม่พบจังหวัดในข้อมูลผู้รับ")
-                        province = 'ไม่ระบุ'
-            else:
-                print(f"❌ ข้อมูลผู้รับไม่ถูกต้อง: {type(recipient)}")
-            
-            print("="*60)
-            
             # 6. หาภาค
             region = self.get_region(province)
-            print(f"🗺️  ภาค: '{region}'")
+            log.debug("🗺️  ภาค: '%s'", region)
             
             # 7. กำหนดเส้นทาง
             delivery_route = self.determine_delivery_route(province, region)
             
             # 8. อัพเดทผลลัพธ์
-            result.update({
-                "success": True,
-                "tracking_number": tracking,
-                "province": province,
-                "region": region,
-                "delivery_route": delivery_route,
-                "data": parcel_data
-            })
+            result.success = True
+            result.tracking_number = tracking
+            result.province = province
+            result.region = region
+            result.delivery_route = delivery_route
+            result.data = parcel_data
             
             # 9. บันทึกลง Database (ถ้าเปิดใช้งาน)
             if save_to_db and self.db_api:
-                print("\n💾 กำลังบันทึกข้อมูลลง Database...")
+                log.debug("\n💾 กำลังบันทึกข้อมูลลง Database...")
                 
                 db_response = self.db_api.save_parcel_to_db(parcel_data)
-                
-                if db_response.get('success'):
-                    result["db_saved"] = True
-                    result["db_parcel_id"] = db_response.get('parcel_id')
-                    result["db_sender_id"] = db_response.get('sender_id')
-                    result["db_recipient_id"] = db_response.get('recipient_id')
-                    self.stats["db_saved"] += 1
-                    print(f"✅ บันทึกลง Database สำเร็จ - Parcel ID: {result['db_parcel_id']}")
-                else:
-                    result["db_saved"] = False
-                    result["db_error"] = db_response.get('message')
-                    self.stats["db_failed"] += 1
-                    print(f"❌ บันทึกลง Database ไม่สำเร็จ: {result['db_error']}")
+                self._apply_db_response(result, db_response)
             
             # 10. อัพเดทสถิติ
-            self.stats["successful"] += 1
-            self.stats["by_region"][region] = self.stats["by_region"].get(region, 0) + 1
-            self.stats["by_province"][province] = self.stats["by_province"].get(province, 0) + 1
-            
             # 11. เก็บข้อมูล
-            self.parcels.append(result)
+            with self._stats_lock:
+                self.stats["successful"] += 1
+                self.stats["by_region"][region] += 1
+                self.stats["by_province"][province] += 1
+                self._append_parcel(result)
             
-            print(f"\n✅ อ่านข้อมูลสำเร็จ:")
-            print(f"   🔢 Tracking: {tracking}")
-            print(f"   📍 ปลายทาง: {province} ({region})")
-            print(f"   🚚 เส้นทางการส่ง: {delivery_route}")
-            if result.get("db_saved"):
-                print(f"   💾 Database ID: {result['db_parcel_id']}")
+            # สรุปบรรทัดเดียวที่ระดับ INFO (รายละเอียดเส้นทางอยู่ที่ DEBUG)
+            log.info("✅ [%s] %s → %s (%s)%s", result.image_file, tracking, province, region,
+                     f" 💾 DB#{result.db_parcel_id}" if result.db_saved else "")
+            log.debug("   🚚 เส้นทางการส่ง: %s", delivery_route)
             
         except Exception as e:
-            result["error"] = str(e)
-            self.stats["failed"] += 1
-            print(f"❌ เกิดข้อผิดพลาด: {e}")
-            import traceback
-            traceback.print_exc()
+            result.error = str(e)
+            self._bump("failed")
+            log.error("❌ [%s] เกิดข้อผิดพลาด: %s", result.image_file, e,
+                      exc_info=log.isEnabledFor(logging.DEBUG))
         
         finally:
-            self.stats["total_processed"] += 1
+            self._bump("total_processed")
         
         return result
     
+    def process_batch(self, image_paths: List[str], enhance_images: bool = True,
+                      save_to_db: bool = True, max_workers: int = 8) -> List[ParcelResult]:
+        """
+        ประมวลผลภาพหลายภาพพร้อมกัน (OCR และ DB เป็นงานรอ network จึงใช้ thread ได้)
+        คืนผลลัพธ์ตามลำดับเดียวกับ image_paths
+        """
+        if not image_paths:
+            return []
+        # ปรับปรุงภาพทั้งชุดครั้งเดียวด้วยหลาย process ก่อนส่งเข้า OCR
+        enhanced_images = [None] * len(image_paths)
+        if enhance_images:
+            log.debug("📸 กำลังปรับปรุงคุณภาพภาพ %s ภาพ...", len(image_paths))
+            enhanced_images = self.preprocessor.enhance_batch(image_paths)
+        # บันทึก Database เป็นชุดละ DB_BULK_SIZE รายการแทนทีละรายการ
+        bulk_db = save_to_db and self.db_api is not None
+        workers = max(1, min(max_workers, len(image_paths)))
+        results = [None] * len(image_paths)
+        pending_db = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parcel") as pool:
+            futures = {
+                pool.submit(self.process_single_parcel, path, enhance_images,
+                            save_to_db and not bulk_db, enhanced_bytes=enhanced): idx
+                for idx, (path, enhanced) in enumerate(zip(image_paths, enhanced_images))
+            }
+            # เก็บผลตามลำดับที่เสร็จ (ภาพที่ OCR ช้าไม่ขวางการบันทึก Database ของภาพอื่น)
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if bulk_db and result.success:
+                    pending_db.append(result)
+                    if len(pending_db) >= DB_BULK_SIZE:
+                        self._flush_db(pending_db)
+        if bulk_db:
+            self._flush_db(pending_db)
+        return results
+    
     def batch_process(self, image_folder: str, enhance_images: bool = True, 
-                     save_to_db: bool = True) -> List[Dict]:
+                     save_to_db: bool = True) -> List[ParcelResult]:
         """ประมวลผลพัสดุหลายรายการ"""
-        results = []
-        supported_formats = ('.jpg', '.jpeg', '.png', '.bmp')
-        
-        print("\n" + "="*60)
-        print("🚀 เริ่มประมวลผลพัสดุทั้งหมด")
-        print("="*60)
+        log.info("\n" + "="*60)
+        log.info("🚀 เริ่มประมวลผลพัสดุทั้งหมด")
+        log.info("="*60)
         
-        image_files = [f for f in os.listdir(image_folder) 
-                      if f.lower().endswith(supported_formats)]
+        # scandir: ได้ชนิดไฟล์มาพร้อมรายการ (ข้ามโฟลเดอร์ย่อยได้โดยไม่ต้อง stat เพิ่ม)
+        with os.scandir(image_folder) as entries:
+            image_files = sorted(e.name for e in entries if is_image_file(e.name) and e.is_file())
         
         total_files = len(image_files)
-        print(f"📦 พบพัสดุทั้งหมด: {total_files} รายการ\n")
-        
-        for idx, filename in enumerate(image_files, 1):
-            print(f"\n[{idx}/{total_files}] {filename}")
-            print("-" * 60)
-            
-            image_path = os.path.join(image_folder, filename)
-            result = self.process_single_parcel(image_path, enhance_images, save_to_db)
-            results.append(result)
+        log.info("📦 พบพัสดุทั้งหมด: %s รายการ\n", total_files)
         
-        return results
+        image_paths = [os.path.join(image_folder, filename) for filename in image_files]
+        return self.process_batch(image_paths, enhance_images, save_to_db)
     
-    def save_individual_json(self, result: Dict) -> Optional[str]:
+    def save_individual_json(self, result: ParcelResult) -> Optional[str]:
         """บันทึกพัสดุแต่ละรายการ"""
-        if not result["success"]:
+        if not result.success:
             return None
         
-        tracking = result["tracking_number"]
-        province = result["province"]
+        tracking = result.tracking_number
+        province = result.province
         
-        province_folder = os.path.join(self.sorted_folder, province)
-        if not os.path.exists(province_folder):
-            os.makedirs(province_folder)
+        province_folder = self._province_folder(province)
         
         filename = f"{tracking}.json"
         filepath = os.path.join(province_folder, filename)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        _dump_json(result.to_dict(), filepath)
         
         return filepath
     
-    def copy_image_to_province_folder(self, result: Dict) -> Optional[str]:
+    def copy_image_to_province_folder(self, result: ParcelResult) -> Optional[str]:
         """คัดลอกภาพพัสดุ"""
-        if not result["success"]:
+        if not result.success:
             return None
         
-        province = result["province"]
-        image_path = result["image_path"]
+        province = result.province
+        image_path = result.image_path
         
-        province_folder = os.path.join(self.sorted_folder, province)
-        if not os.path.exists(province_folder):
-            os.makedirs(province_folder)
+        province_folder = self._province_folder(province)
         
-        import shutil
         image_filename = os.path.basename(image_path)
         dest_path = os.path.join(province_folder, image_filename)
         
         try:
-            shutil.copy2(image_path, dest_path)
+            # hardlink ก่อน (ดิสก์เดียวกันไม่ต้องคัดลอกข้อมูลเลย) ไม่ได้ค่อยคัดลอก
+            # (ต่างดิสก์ / ระบบไฟล์ไม่รองรับ / มีไฟล์ปลายทางอยู่แล้ว)
+            try:
+                os.link(image_path, dest_path)
+            except OSError:
+                if os.path.exists(dest_path) and os.path.samefile(image_path, dest_path):
+                    return dest_path  # เป็น hardlink ของไฟล์เดียวกันอยู่แล้ว (รันซ้ำ)
+                shutil.copyfile(image_path, dest_path)  # ใช้ sendfile / copy ใน kernel เมื่อทำได้
+                shutil.copystat(image_path, dest_path)
             return dest_path
         except Exception as e:
-            print(f"⚠️ ไม่สามารถคัดลอกภาพ: {e}")
+            log.warning("⚠️ ไม่สามารถคัดลอกภาพ: %s", e)
             return None
     
-    def save_batch_json(self, results: List[Dict], output_file: str = None) -> str:
+    def save_results(self, results: List[ParcelResult], max_workers: Optional[int] = None):
+        """บันทึก JSON และคัดลอกภาพของพัสดุที่สำเร็จทั้งหมดพร้อมกัน (งาน I/O ล้วน จึงใช้ thread)"""
+        successful = [r for r in results if r.success]
+        if not successful:
+            return
+        workers = max_workers or min(32, (os.cpu_count() or 1) * 2)
+        
+        def save_one(result: ParcelResult):
+            self.save_individual_json(result)
+            self.copy_image_to_province_folder(result)
+        
+        with ThreadPoolExecutor(max_workers=min(workers, len(successful)), thread_name_prefix="save") as pool:
+            # list() เพื่อให้ exception จาก thread ถูกส่งต่อออกมา
+            list(pool.map(save_one, successful))
+    
+    def save_batch_json(self, results: List[ParcelResult], output_file: str = None) -> str:
         """บันทึกผลลัพธ์รวม"""
         if output_file is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -1055,7 +1584,7 @@ class CompleteParcelSortingSystem:
         
         filepath = os.path.join(self.output_folder, output_file)
         
-        batch_data = {
+        batch_info = {
             "batch_info": {
                 "total_processed": self.stats["total_processed"],
                 "successful": self.stats["successful"],
@@ -1067,17 +1596,16 @@ class CompleteParcelSortingSystem:
             "statistics": {
                 "by_region": self.stats["by_region"],
                 "by_province": self.stats["by_province"]
-            },
-            "parcels": results
+            }
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(batch_data, f, ensure_ascii=False, indent=2)
+        # เขียนพัสดุทีละรายการต่อท้ายไฟล์ (batch ใหญ่ไม่ต้องมี dict ของทุกพัสดุซ้อนอีกชุดในหน่วยความจำ)
+        _dump_json_items(batch_info, "parcels", (result.to_dict() for result in results), filepath)
         
-        print(f"\n💾 บันทึกผลลัพธ์รวมที่: {filepath}")
+        log.info("\n💾 บันทึกผลลัพธ์รวมที่: %s", filepath)
         return filepath
     
-    def generate_sorting_report(self, results: List[Dict]) -> str:
+    def generate_sorting_report(self, results: List[ParcelResult]) -> str:
         """สร้างรายงาน"""
         report = []
         report.append("="*80)
@@ -1115,12 +1643,11 @@ class CompleteParcelSortingSystem:
             report.append("📍 การกระจายตัวตามจังหวัด")
             report.append("-" * 80)
             
-            sorted_provinces = sorted(self.stats['by_province'].items(), 
-                                     key=lambda x: x[1], reverse=True)
+            sorted_provinces = self.stats['by_province'].most_common()
             
             for province, count in sorted_provinces:
                 percentage = (count / self.stats['successful']) * 100 if self.stats['successful'] > 0 else 0
-                bar = "█" * min(int(percentage / 2), 40)
+                bar = REPORT_BARS[min(int(percentage / 2), 40)]
                 region = self.get_region(province)
                 report.append(f"{province:20s} ({region:15s}) {count:3d} พัสดุ {bar} {percentage:5.1f}%")
             
@@ -1133,7 +1660,7 @@ class CompleteParcelSortingSystem:
             for region in sorted(self.stats['by_region'].keys()):
                 count = self.stats['by_region'][region]
                 percentage = (count / self.stats['successful']) * 100 if self.stats['successful'] > 0 else 0
-                bar = "█" * int(percentage / 2)
+                bar = REPORT_BARS[min(int(percentage / 2), 50)]
                 report.append(f"{region:30s} {count:3d} พัสดุ {bar} {percentage:5.1f}%")
             
             report.append("")
@@ -1142,7 +1669,7 @@ class CompleteParcelSortingSystem:
         
         return "\n".join(report)
     
-    def save_report(self, results: List[Dict], output_file: str = None):
+    def save_report(self, results: List[ParcelResult], output_file: str = None):
         """บันทึกรายงาน"""
         if output_file is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -1153,7 +1680,7 @@ class CompleteParcelSortingSystem:
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(self.generate_sorting_report(results))
         
-        print(f"💾 บันทึกรายงานที่: {filepath}")
+        log.info("💾 บันทึกรายงานที่: %s", filepath)
         return filepath
 
 
@@ -1165,6 +1692,9 @@ def main():
     # โหลดค่าจากไฟล์ .env
     load_dotenv()
     
+    # รายละเอียดทีละขั้นตอนของแต่ละพัสดุอยู่ที่ระดับ DEBUG (ตั้ง LOG_LEVEL=DEBUG เพื่อดู)
+    logging.basicConfig(level=getenv("LOG_LEVEL", "INFO").upper(), format="%(message)s")
+    
     # API Keys และ Configuration
     TYPHOON_API_KEY = getenv("TYPHOON_API_KEY")
     DB_API_URL = getenv("DB_API_URL", "http://localhost/test/data.php")  # URL ของ PHP API
@@ -1214,10 +1744,7 @@ def main():
     print("\n💾 กำลังบันทึกและจัดเก็บพัสดุ...")
     
     # บันทึก JSON และคัดลอกภาพ
-    for result in results:
-        if result["success"]:
-            system.save_individual_json(result)
-            system.copy_image_to_province_folder(result)
+    system.save_results(results)
     
     # แสดงสถิติ Database
     print(f"\n📊 สถิติการบันทึก Database:")